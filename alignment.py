@@ -0,0 +1,169 @@
+# Seed-and-extend local alignment for finding copied passages
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from winnowing import kgram_hashes
+
+Passage = namedtuple('Passage', ['start_a', 'end_a', 'start_b', 'end_b', 'matched', 'score', 'similarity'])
+Prepared = namedtuple('Prepared', ['tokens', 'hashes', 'index', 'frequent'])
+
+def prepare(tokens, k=5, max_occurrences=16, index=True):
+    """Hash a token list's k-grams once for repeated ``local_alignments`` calls.
+
+    With ``index`` the k-grams are also indexed by position, as the second
+    side needs; k-grams occurring more than ``max_occurrences`` times go to
+    ``frequent`` instead, and only seed where nothing else has aligned,
+    which keeps boilerplate from making the seed count quadratic. A list
+    prepared without an index can be passed back in to add one.
+    """
+    if isinstance(tokens, Prepared):
+        if tokens.index is not None or not index:
+            return tokens
+        tokens, hashes = tokens.tokens, tokens.hashes
+    else:
+        hashes = kgram_hashes(tokens, k)
+    if not index:
+        return Prepared(tokens, hashes, None, None)
+    index = defaultdict(list)
+    for position, h in enumerate(hashes):
+        index[h].append(position)
+    return Prepared(tokens, hashes,
+                    {h: found for h, found in index.items() if len(found) <= max_occurrences},
+                    {h: found for h, found in index.items() if len(found) > max_occurrences})
+
+def _tokens(tokens):
+    return tokens.tokens if isinstance(tokens, Prepared) else tokens
+
+def _extend(a, b, i, j, step, x_drop, mismatch, max_steps):
+    # Ungapped X-drop extension from (i, j): stop once the running score has
+    # fallen more than x_drop below its best. Returns (length, score, matches)
+    # of the best-scoring prefix.
+    score = best = matches = best_matches = length = best_length = 0
+    while length < max_steps and 0 <= i < len(a) and 0 <= j < len(b):
+        length += 1
+        if a[i] == b[j]:
+            score += 1
+            matches += 1
+        else:
+            score += mismatch
+        if score > best:
+            best, best_length, best_matches = score, length, matches
+        elif best - score > x_drop:
+            break
+        i += step
+        j += step
+    return best_length, best, best_matches
+
+def _segments(a, b, k, x_drop, mismatch):
+    # High-scoring ungapped segments grown from shared k-gram seeds. Seeds
+    # inside a segment already found on the same diagonal are skipped, so
+    # each stretch of a diagonal is extended once. A k-gram too common to
+    # index seeds once, at its first occurrence in b past every segment
+    # seeded that way so far; repetitive passages are still found, at any
+    # offset, with one extension per position at most.
+    covered = {}
+    segments = []
+    frequent_end = 0
+    for i, h in enumerate(a.hashes):
+        found = b.index.get(h)
+        if found is None:
+            positions = b.frequent.get(h, ())
+            start = bisect_left(positions, frequent_end)
+            found = positions[start:start + 1]
+        for j in found:
+            diagonal = j - i
+            done = covered.get(diagonal, 0)
+            if done > i or a.tokens[i:i + k] != b.tokens[j:j + k]:
+                continue
+            back, back_score, back_matches = _extend(a.tokens, b.tokens, i - 1, j - 1, -1, x_drop, mismatch, i - done)
+            ahead, ahead_score, ahead_matches = _extend(a.tokens, b.tokens, i + k, j + k, 1, x_drop, mismatch,
+                                                        len(a.tokens))
+            start, end = i - back, i + k + ahead
+            covered[diagonal] = end
+            if h not in b.index:
+                frequent_end = max(frequent_end, end + diagonal)
+            segments.append([start, end, start + diagonal, end + diagonal,
+                             k + back_matches + ahead_matches, k + back_score + ahead_score])
+    return segments
+
+def _chain(segments, max_gap, gap_penalty):
+    # Join segments that follow each other in both documents with at most
+    # max_gap tokens between them, so an edited passage stays one passage.
+    passages = []
+    active = []
+    for segment in sorted(segments):
+        start_a, _, start_b, _, matched, score = segment
+        # Segments come in start_a order, so passages ending before
+        # start_a - max_gap can never be extended again
+        active = [passage for passage in active if passage[1] >= start_a - max_gap]
+        best = None
+        for passage in active:
+            gap_a, gap_b = start_a - passage[1], start_b - passage[3]
+            if 0 <= gap_a <= max_gap and 0 <= gap_b <= max_gap:
+                joined = passage[5] + score - gap_penalty * max(gap_a, gap_b)
+                if joined > passage[5] and (best is None or joined > best[1]):
+                    best = (passage, joined)
+        if best is None:
+            passages.append(list(segment))
+            active.append(passages[-1])
+        else:
+            passage, joined = best
+            passage[1], passage[3] = segment[1], segment[3]
+            passage[4] += matched
+            passage[5] = joined
+    return passages
+
+def local_alignments(tokens_a, tokens_b, k=5, x_drop=8, mismatch=-1, max_gap=10, gap_penalty=0.5,
+                     max_occurrences=16, min_tokens=None):
+    """Locally aligned passages shared by two token lists, best first.
+
+    Shared k-grams seed ungapped X-drop extensions; extensions close to
+    each other in both documents are chained across small edits. Each
+    ``Passage`` gives token ranges ``[start, end)`` in both lists, the
+    number of matched tokens, the alignment score and the passage's own
+    similarity (0-1, matched tokens over the passage length). Passages with
+    fewer than ``min_tokens`` (default ``k``) matched tokens are dropped.
+    Either argument may be a ``prepare``d list (built with the same ``k``);
+    preparing the second side once pays off when it is aligned against many
+    documents. A document shorter than ``k`` is matched whole instead, with
+    ``k`` lowered to its length.
+    """
+    shortest = min(len(_tokens(tokens_a)), len(_tokens(tokens_b)))
+    if 0 < shortest < k:
+        tokens_a, tokens_b, k = _tokens(tokens_a), _tokens(tokens_b), shortest
+    # The first side is only scanned, so it needs no seed index
+    a = prepare(tokens_a, k, index=False)
+    b = prepare(tokens_b, k, max_occurrences)
+    min_tokens = k if min_tokens is None else min_tokens
+    passages = [
+        Passage(start_a, end_a, start_b, end_b, matched, score,
+                2 * matched / ((end_a - start_a) + (end_b - start_b)))
+        for start_a, end_a, start_b, end_b, matched, score
+        in _chain(_segments(a, b, k, x_drop, mismatch), max_gap, gap_penalty)
+        if matched >= min_tokens
+    ]
+    return sorted(passages, key=lambda passage: (-passage.score, passage.start_a, passage.start_b))
+
+def _covered(ranges):
+    total = end = 0
+    for start, stop in sorted(ranges):
+        if stop > end:
+            total += stop - max(start, end)
+            end = stop
+    return total
+
+def alignment_similarity(tokens_a, tokens_b, **options):
+    """Similarity (0-100) from local alignment: the share of either document
+    covered by aligned passages, whichever is larger.
+
+    Unlike the whole-document blend, a passage copied into a long essay
+    scores its full share of the shorter text. ``options`` go to
+    ``local_alignments``.
+    """
+    length_a = len(_tokens(tokens_a))
+    length_b = len(_tokens(tokens_b))
+    if not length_a or not length_b:
+        return 0.0
+    passages = local_alignments(tokens_a, tokens_b, **options)
+    coverage_a = _covered((p.start_a, p.end_a) for p in passages) / length_a
+    coverage_b = _covered((p.start_b, p.end_b) for p in passages) / length_b
+    return round(max(coverage_a, coverage_b) * 100, 2)
@@ -0,0 +1,275 @@
+# Benchmarks for the plagiarism checker pipeline
+#
+#   python benchmark.py                        # every benchmark, default sizes
+#   python benchmark.py compare-all highlight --scale 0.2 --output bench.json
+#
+# Corpora come from synthetic_corpus with fixed seeds, so results from two
+# versions of the code can be compared case by case.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from html import escape
+from compare_text import compare_all_submissions, compare_code_submissions
+from extract_text import extract_text_from_file
+from highlight_matches import highlight_matches
+from lsh import MinHashLSH
+from report_generator import generate_comparison_report, stream_html_report
+from synthetic_corpus import generate_code_corpus, generate_text_corpus, write_corpus
+from text_analysis import generate_text_statistics
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def _peak_memory(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def measure(func, *args, repeat=3):
+    """Best wall time over ``repeat`` runs and peak traced memory of one run."""
+    return {
+        "seconds": round(min(_timed(func, *args) for _ in range(repeat)), 6),
+        "peak_bytes": _peak_memory(func, *args),
+    }
+
+def _concatenating_html_report(report, esc=str):
+    """The pre-template renderer: repeated ``+=``, each value passed through
+    ``esc`` (no escaping by default, as the original did)."""
+    html = f"""
+    <html>
+    <head>
+        <title>Plagiarism Check Report</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 20px; }}
+            .section {{ margin: 20px 0; padding: 20px; border: 1px solid #ddd; border-radius: 5px; }}
+            .header {{ background-color: #f8f9fa; padding: 10px; }}
+            table {{ width: 100%; border-collapse: collapse; }}
+            th, td {{ padding: 8px; border: 1px solid #ddd; text-align: left; }}
+            th {{ background-color: #f8f9fa; }}
+        </style>
+    </head>
+    <body>
+        <h1>Plagiarism Check Report</h1>
+        
+        <div class="section">
+            <h2>Report Metadata</h2>
+            <p><strong>Generated at:</strong> {esc(report["report_metadata"]["generated_at"])}</p>
+            <p><strong>Files Compared:</strong> {esc(', '.join(report["report_metadata"]["files_compared"]))}</p>
+        </div>
+        
+        <div class="section">
+            <h2>Similarity Analysis</h2>
+            <table>
+                <tr><th>Metric</th><th>Score</th></tr>
+                <tr><td>Overall Similarity</td><td>{esc(report["similarity_analysis"]["overall_similarity"])}</td></tr>
+                <tr><td>N-gram Similarity</td><td>{esc(report["similarity_analysis"]["ngram_similarity"])}</td></tr>
+                <tr><td>Paraphrase Detection</td><td>{esc(report["similarity_analysis"]["paraphrase_detection_score"])}</td></tr>
+            </table>
+        </div>
+        
+        <div class="section">
+            <h2>Document Statistics</h2>
+            <table>
+                <tr><th>Metric</th>
+                    <th>{esc(report["report_metadata"]["files_compared"][0])}</th>
+                    <th>{esc(report["report_metadata"]["files_compared"][1])}</th></tr>
+    """
+    
+    # Add document statistics
+    for metric in report["document_statistics"][report["report_metadata"]["files_compared"][0]].keys():
+        html += f"""
+                <tr>
+                    <td>{esc(metric)}</td>
+                    <td>{esc(report["document_statistics"][report["report_metadata"]["files_compared"][0]][metric])}</td>
+                    <td>{esc(report["document_statistics"][report["report_metadata"]["files_compared"][1]][metric])}</td>
+                </tr>
+        """
+    
+    html += """
+            </table>
+        </div>
+        
+        <div class="section">
+            <h2>Citations Found</h2>
+    """
+    
+    for file_name in report["citations_found"]:
+        html += f"""
+            <h3>{esc(file_name)}</h3>
+            <ul>
+        """
+        for citation in report["citations_found"][file_name]:
+            html += f"<li>{esc(citation)}</li>"
+        html += "</ul>"
+    
+    html += """
+        </div>
+    </body>
+    </html>
+    """
+    
+    return html
+
+def _write_concatenated(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(_concatenating_html_report(report))
+
+def _write_concatenated_escaped(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(_concatenating_html_report(report, lambda value: escape(str(value))))
+
+def _write_streamed(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in stream_html_report(report):
+            f.write(chunk)
+
+def synthetic_report(citations):
+    stats = {'Word Count': 5000, 'Sentence Count': 250, 'Average Words per Sentence': 20.0,
+             'Unique Words': 1200, 'Character Count': 30000}
+    return generate_comparison_report(
+        "essay_a.txt", "essay_b.txt", 42.5, stats, stats,
+        [f"(Author{i}, {1900 + i % 120}) <ref {i}>" for i in range(citations)],
+        [f"[{i}] Journal & Proceedings" for i in range(citations)],
+        ngram_sim=0.31, paraphrase_score=0.27,
+    )
+
+def _scaled(sizes, scale):
+    return [max(2, int(size * scale)) for size in sizes]
+
+def bench_html_report(repeat=3, scale=1.0):
+    """Time and peak memory of writing an HTML report to disk with the old
+    concatenating renderer, the same renderer escaping every value (the
+    like-for-like baseline) and the streaming template renderer."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "report.html")
+        for citations in _scaled((1000, 10000, 100000), scale):
+            report = synthetic_report(citations)
+            for renderer, write in (("concatenation", _write_concatenated),
+                                    ("concatenation_escaped", _write_concatenated_escaped),
+                                    ("streaming", _write_streamed)):
+                results.append({"benchmark": "html_report", "citations": citations, "renderer": renderer,
+                                **measure(write, report, path, repeat=repeat)})
+    return results
+
+def bench_compare_all(repeat=3, scale=1.0):
+    """compare_all_submissions over growing cohorts of 300-word essays:
+    exhaustive, with a cut-off, with LSH candidate pruning for the same
+    cut-off and with the alignment backend."""
+    results = []
+    for docs in _scaled((20, 60, 150), scale):
+        texts, _ = generate_text_corpus(docs, words_per_doc=300, seed=docs)
+        results.append({"benchmark": "compare_all", "documents": docs, "mode": "exhaustive",
+                        **measure(compare_all_submissions, texts, repeat=repeat)})
+        results.append({"benchmark": "compare_all", "documents": docs, "mode": "threshold", "min_similarity": 60,
+                        **measure(compare_all_submissions, texts, 60, repeat=repeat)})
+        results.append({"benchmark": "compare_all", "documents": docs, "mode": "lsh", "min_similarity": 60,
+                        **measure(lambda: compare_all_submissions(texts, 60, MinHashLSH.for_min_similarity(60)),
+                                  repeat=repeat)})
+        results.append({"benchmark": "compare_all", "documents": docs, "mode": "align",
+                        **measure(lambda: compare_all_submissions(texts, method="align"), repeat=repeat)})
+    return results
+
+def bench_compare_code(repeat=3, scale=1.0):
+    """compare_code_submissions with both engines over 200-line submissions."""
+    results = []
+    for docs in _scaled((20, 60, 150), scale):
+        codes, _ = generate_code_corpus(docs, lines_per_doc=200, seed=docs)
+        for method in ("combined", "winnow"):
+            results.append({"benchmark": "compare_code", "documents": docs, "method": method,
+                            **measure(compare_code_submissions, codes, 0, None, method, repeat=repeat)})
+    return results
+
+def bench_highlight(repeat=3, scale=1.0):
+    """highlight_matches on a document pair sharing half their text."""
+    results = []
+    for words in _scaled((1000, 10000, 50000), scale):
+        texts, _ = generate_text_corpus(2, words_per_doc=words, plagiarized_share=1.0,
+                                        paraphrased_share=0.0, seed=words)
+        text1, text2 = texts.values()
+        results.append({"benchmark": "highlight", "words": words,
+                        **measure(highlight_matches, text1, text2, repeat=repeat)})
+    return results
+
+def bench_extract(repeat=3, scale=1.0):
+    """extract_text_from_file over a directory of text and code submissions."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for files in _scaled((50, 200, 800), scale):
+            texts, _ = generate_text_corpus(files // 2, words_per_doc=500, seed=files)
+            codes, _ = generate_code_corpus(files - files // 2, lines_per_doc=100, seed=files)
+            paths = write_corpus({**texts, **codes}, os.path.join(tmp, str(files)))
+            run = lambda: [extract_text_from_file(path) for path in paths]
+            results.append({"benchmark": "extract", "files": len(paths),
+                            "bytes": sum(os.path.getsize(path) for path in paths),
+                            **measure(run, repeat=repeat)})
+    return results
+
+def bench_statistics(repeat=3, scale=1.0):
+    """generate_text_statistics on one document of growing length."""
+    generate_text_statistics("Warm up. The sentence tokenizer loads on first use.")
+    results = []
+    for words in _scaled((1000, 10000, 100000), scale):
+        texts, _ = generate_text_corpus(1, words_per_doc=words, seed=words)
+        text = next(iter(texts.values()))
+        results.append({"benchmark": "statistics", "words": words,
+                        **measure(generate_text_statistics, text, repeat=repeat)})
+    return results
+
+BENCHMARKS = {
+    "compare-all": bench_compare_all,
+    "compare-code": bench_compare_code,
+    "extract": bench_extract,
+    "highlight": bench_highlight,
+    "html-report": bench_html_report,
+    "statistics": bench_statistics,
+}
+
+def environment():
+    """Metadata stored next to results so runs of different versions can be told apart."""
+    try:
+        revision = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        revision = ""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": revision or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the plagiarism checker pipeline.")
+    parser.add_argument("benchmarks", nargs="*", help=f"benchmarks to run (default: all of {', '.join(sorted(BENCHMARKS))})")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions per case")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every benchmark's sizes")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = []
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        for result in BENCHMARKS[name](repeat=args.repeat, scale=args.scale):
+            print(json.dumps(result))
+            results.append(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=4)
+    return results
+
+if __name__ == "__main__":
+    main()
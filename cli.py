@@ -0,0 +1,93 @@
+# Headless entry point: batch checks from the shell and the local job server
+#
+#   python cli.py check submissions/ --output reports/batch --min-similarity 40 --top-k 100
+#   python cli.py check manifest.txt --lsh --workers 8 --cache .extraction_cache
+#   python cli.py serve --port 8765 --jobs 2
+import argparse
+import json
+import sys
+import instrumentation
+
+def _print_progress(stage, done, total):
+    counter = f"{done}/{total}" if total else str(done)
+    print(f"{stage}: {counter}", file=sys.stderr, flush=True)
+
+def check(args):
+    from jobs import run_check
+    summary = run_check(
+        args.source,
+        output_dir=args.output,
+        min_similarity=args.min_similarity,
+        top_k=args.top_k,
+        use_lsh=args.lsh,
+        exclude_citations=args.exclude_citations,
+        text_method=args.text_method,
+        code_method=args.code_method,
+        workers=args.workers,
+        timeout=args.timeout,
+        cache_dir=args.cache,
+        cohort=args.cohort,
+        starter=args.starter,
+        max_doc_share=args.max_doc_share,
+        min_cohort=args.min_cohort,
+        progress=None if args.quiet else _print_progress,
+    )
+    print(json.dumps(summary, indent=4))
+    return 1 if summary["failed_extractions"] else 0
+
+def serve(args):
+    from job_api import make_server
+    server = make_server(args.host, args.port, args.jobs, args.root)
+    print(f"Serving jobs on http://{args.host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.RequestHandlerClass.queue.shutdown(wait=False)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless plagiarism checker.")
+    parser.add_argument("--instrument", action="store_true", help="record stage timings and counters")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    check_parser = commands.add_parser("check", help="check a directory or manifest of submissions")
+    check_parser.add_argument("source", help="submission directory, or a manifest (.json list or one path per line)")
+    check_parser.add_argument("--output", default="reports/batch", help="directory for results")
+    check_parser.add_argument("--min-similarity", type=float, default=0)
+    check_parser.add_argument("--top-k", type=int, help="keep only the k most similar text pairs")
+    check_parser.add_argument("--lsh", action="store_true",
+                              help="only score MinHash LSH candidates for --min-similarity (must be > 50)")
+    check_parser.add_argument("--exclude-citations", action="store_true")
+    check_parser.add_argument("--text-method", choices=["combined", "align"], default="combined",
+                              help="whole-document blend or local alignment")
+    check_parser.add_argument("--code-method", choices=["winnow", "combined", "align"], default="winnow")
+    check_parser.add_argument("--starter", help="directory or manifest of starter code to ignore (winnow only)")
+    check_parser.add_argument("--max-doc-share", type=float,
+                              help="ignore code fingerprints in more than this share of submissions (winnow only)")
+    check_parser.add_argument("--min-cohort", type=int, default=50,
+                              help="smallest cohort --max-doc-share applies to")
+    check_parser.add_argument("--workers", type=int, help="extraction processes (default: CPU count)")
+    check_parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per file")
+    check_parser.add_argument("--cache", help="extraction cache directory")
+    check_parser.add_argument("--cohort", action="store_true", help="write a Parquet cohort store for text")
+    check_parser.add_argument("--quiet", action="store_true", help="no progress on stderr")
+    check_parser.set_defaults(run=check)
+
+    serve_parser = commands.add_parser("serve", help="run the local HTTP job API")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--jobs", type=int, default=2, help="checks run at once")
+    serve_parser.add_argument("--root", action="append",
+                              help="directory jobs may read and write under (repeatable; default: current directory)")
+    serve_parser.set_defaults(run=serve)
+
+    args = parser.parse_args(argv)
+    if args.instrument:
+        instrumentation.enable()
+    return args.run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# Language-aware code comparison: normalized token streams + winnowed fingerprints
+import keyword
+import os
+import re
+from collections import defaultdict
+from itertools import combinations
+from winnowing import fingerprint
+
+PYTHON_KEYWORDS = set(keyword.kwlist) | {'print', 'self', 'len', 'range'}
+
+C_FAMILY_KEYWORDS = {
+    'auto', 'break', 'case', 'char', 'const', 'continue', 'default', 'do', 'double', 'else',
+    'enum', 'extern', 'float', 'for', 'goto', 'if', 'inline', 'int', 'long', 'register',
+    'return', 'short', 'signed', 'sizeof', 'static', 'struct', 'switch', 'typedef', 'union',
+    'unsigned', 'void', 'volatile', 'while', 'bool', 'true', 'false', 'class', 'public',
+    'private', 'protected', 'virtual', 'template', 'typename', 'namespace', 'using', 'new',
+    'delete', 'this', 'throw', 'try', 'catch', 'operator', 'nullptr', 'std', 'cout', 'cin',
+    'endl', 'abstract', 'boolean', 'byte', 'extends', 'final', 'finally', 'implements',
+    'import', 'instanceof', 'interface', 'native', 'null', 'package', 'super',
+    'synchronized', 'throws', 'transient', 'String', 'System', 'main',
+}
+
+_PYTHON_TOKEN = re.compile(r'''
+    (?P<comment>\#[^\n]*)
+  | (?P<string>[rRbBuUfF]{0,2}(?:"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'))
+  | (?P<number>\d[\w.]*|\.\d[\w.]*)
+  | (?P<name>[^\W\d]\w*)
+  | (?P<op>\*\*=?|//=?|->|:=|[-+*/%&|^<>=!]=|<<=?|>>=?|\S)
+''', re.VERBOSE)
+
+_C_FAMILY_TOKEN = re.compile(r'''
+    (?P<comment>//[^\n]*|/\*[\s\S]*?\*/|\#[^\n]*)
+  | (?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+  | (?P<number>\d[\w.]*|\.\d[\w.]*)
+  | (?P<name>[^\W\d]\w*)
+  | (?P<op>->|\+\+|--|&&|\|\||::|<<=?|>>=?|[-+*/%&|^<>=!]=|\S)
+''', re.VERBOSE)
+
+LANGUAGES = {
+    'python': (_PYTHON_TOKEN, PYTHON_KEYWORDS),
+    'c': (_C_FAMILY_TOKEN, C_FAMILY_KEYWORDS),
+}
+
+EXTENSION_LANGUAGES = {'.py': 'python', '.java': 'c', '.cpp': 'c', '.c': 'c'}
+
+def detect_language(name, code):
+    """Language family from the file extension, else from braces and semicolons."""
+    language = EXTENSION_LANGUAGES.get(os.path.splitext(name)[1].lower())
+    if language:
+        return language
+    return 'c' if code.count(';') + code.count('{') > code.count(':') else 'python'
+
+def normalized_tokens(code, language='python'):
+    """Lex ``code`` and normalize it so renaming cannot hide copying.
+
+    Comments and whitespace are dropped, identifiers become ``V``, string
+    literals ``S`` and numbers ``N``; keywords and operators are kept.
+    """
+    pattern, keywords = LANGUAGES[language]
+    tokens = []
+    for m in pattern.finditer(code):
+        kind = m.lastgroup
+        if kind == 'comment':
+            continue
+        if kind == 'name':
+            value = m.group()
+            tokens.append(value if value in keywords else 'V')
+        elif kind == 'string':
+            tokens.append('S')
+        elif kind == 'number':
+            tokens.append('N')
+        else:
+            tokens.append(m.group())
+    return tokens
+
+def code_fingerprints(code, language='python', k=12, window=8):
+    """Set of winnowed fingerprint hashes of a normalized token stream."""
+    return {h for h, _ in fingerprint(normalized_tokens(code, language), k, window)}
+
+def compare_code_fingerprints(code_texts, min_similarity=0, k=12, window=8, starter_code=None,
+                              max_doc_share=None, min_cohort=50):
+    """Score every pair of code submissions by shared winnowed fingerprints.
+
+    ``similarity`` is the Dice coefficient of the two fingerprint sets, from
+    0 to 100. Fingerprints of ``starter_code`` (``{name: code}`` handed out
+    with the assignment) are ignored. With ``max_doc_share``, fingerprints
+    found in more than that share of the submissions are ignored too, but
+    only in cohorts of at least ``min_cohort`` submissions, so a copy ring
+    in a small class is never mistaken for boilerplate. Pair counts come
+    from an inverted index, so unrelated pairs cost nothing beyond their
+    zero record.
+    """
+    keys = list(code_texts.keys())
+    prints = [
+        code_fingerprints(code_texts[key], detect_language(key, code_texts[key]), k, window)
+        for key in keys
+    ]
+    postings = defaultdict(list)
+    for index, hashes in enumerate(prints):
+        for h in hashes:
+            postings[h].append(index)
+    common = set()
+    for name, code in (starter_code or {}).items():
+        common |= code_fingerprints(code, detect_language(name, code), k, window)
+    if max_doc_share is not None and len(keys) >= min_cohort:
+        common |= {h for h, docs in postings.items() if len(docs) > max_doc_share * len(keys)}
+    sizes = [len(hashes - common) for hashes in prints]
+    shared = defaultdict(int)
+    for h, docs in postings.items():
+        if h not in common:
+            for pair in combinations(docs, 2):
+                shared[pair] += 1
+
+    results = []
+    for i, j in combinations(range(len(keys)), 2):
+        total = sizes[i] + sizes[j]
+        score = round(200 * shared.get((i, j), 0) / total, 2) if total else 0.0
+        if score >= min_similarity:
+            results.append({"file1": keys[i], "file2": keys[j], "similarity": score})
+    return results
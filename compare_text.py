@@ -2,8 +2,17 @@
 from difflib import SequenceMatcher
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+from scipy.sparse import csr_matrix
 import tokenize
 from io import BytesIO
+from collections import defaultdict
+import csv
+import heapq
+import instrumentation
+from code_similarity import compare_code_fingerprints
+from text_analysis import mask_citations
+from alignment import alignment_similarity, prepare
 
 STOPWORDS = {
     'the', 'is', 'in', 'a', 'an', 'and', 'of', 'to', 'it', 'on', 'for', 'with', 'that', 'this',
@@ -15,7 +24,9 @@ STOPWORDS = {
 def preprocess(text):
     return [word.strip('.,()').lower() for word in text.split() if word.lower().strip('.,()') not in STOPWORDS]
 
-def combined_similarity(words_a, words_b):
+def combined_similarity(words_a, words_b, method="combined"):
+    if method == "align":
+        return alignment_similarity(words_a, words_b)
     a = " ".join(words_a)
     b = " ".join(words_b)
     vec = CountVectorizer().fit_transform([a, b])
@@ -23,16 +34,229 @@ def combined_similarity(words_a, words_b):
     difflib_sim = SequenceMatcher(None, words_a, words_b).ratio() * 100
     return round((cosine_sim + difflib_sim) / 2, 2)
 
-def compare_all_submissions(texts):
-    results = []
+def _unit_vectors(docs):
+    # One vocabulary fitted over every document; rows are L2-normalised so a
+    # dot product between two rows is their cosine similarity.
+    with instrumentation.stage("vectorize"):
+        try:
+            counts = CountVectorizer().fit_transform([" ".join(words) for words in docs])
+        except ValueError:  # empty vocabulary: no document has a usable term
+            return csr_matrix((len(docs), 1))
+        return normalize(counts.astype(float))
+
+def cosine_matrix(docs):
+    """Pairwise cosine similarity (0-100) of token lists as a sparse matrix.
+
+    The vocabulary is fitted once over every document, so the whole matrix is
+    a single sparse product instead of one CountVectorizer fit per pair.
+    Terms a pair does not share are zero in both rows, so each entry equals
+    the cosine part of ``combined_similarity``.
+    """
+    unit = _unit_vectors(docs)
+    return (unit @ unit.T).tocsr() * 100
+
+def _pair_columns(count, pairs):
+    # (j, sorted earlier indices to score against j): every pair, or only
+    # the given candidate pairs
+    if pairs is None:
+        return ((j, range(j)) for j in range(1, count))
+    columns = defaultdict(list)
+    for i, j in pairs:
+        columns[max(i, j)].append(min(i, j))
+    return ((j, sorted(columns[j])) for j in sorted(columns))
+
+def blended_score(matcher, cosine_sim, min_similarity=0):
+    """Finish ``combined_similarity`` for a prepared SequenceMatcher.
+
+    ``matcher`` holds the pair as (seq1, seq2) and ``cosine_sim`` is their
+    cosine (0-100). Returns None when the pair cannot reach
+    ``min_similarity``; difflib's cheap upper bounds are tried first so
+    ratio() only runs for pairs that can still make the cut.
+    """
+    for bound in (lambda: 1.0, matcher.real_quick_ratio, matcher.quick_ratio):
+        if round((cosine_sim + bound() * 100) / 2, 2) < min_similarity:
+            return None
+    score = round((cosine_sim + matcher.ratio() * 100) / 2, 2)
+    return score if score >= min_similarity else None
+
+def _cosine_columns(docs, pairs, block_size=256, vectors=None):
+    # Yield (j, earlier indices, their cosines with j). Exhaustive runs take
+    # the product a block of rows at a time, so memory stays at
+    # block_size x n; candidate runs only touch the listed pairs.
+    unit = _unit_vectors(docs) if vectors is None else vectors
+    if pairs is None:
+        for start in range(0, len(docs), block_size):
+            block = (unit[start:start + block_size] @ unit.T).toarray() * 100
+            for j in range(max(start, 1), min(start + block_size, len(docs))):
+                yield j, range(j), block[j - start]
+        return
+    for j, rows in _pair_columns(len(docs), pairs):
+        yield j, rows, dict(zip(rows, (unit[rows] @ unit[j].T).toarray().ravel() * 100))
+
+def _scored(docs, pairs, floor, vectors=None):
+    # floor() is re-read for every pair so callers can raise the cut-off
+    # while scoring is under way (see top_similarities).
+    matcher = SequenceMatcher(None)
+    compared = 0
+    try:
+        for j, rows, cosines in _cosine_columns(docs, pairs, vectors=vectors):
+            matcher.set_seq2(docs[j])
+            for i in rows:
+                compared += 1
+                matcher.set_seq1(docs[i])
+                score = blended_score(matcher, cosines[i], floor())
+                if score is not None:
+                    yield i, j, score
+    finally:
+        instrumentation.count("pairs_compared", compared)
+
+def _aligned(docs, pairs, floor):
+    # Local alignment backend; every document's k-grams are hashed once, and
+    # its seed index is built once and reused against every earlier document.
+    hashed = [prepare(words, index=False) for words in docs]
+    compared = 0
+    try:
+        for j, rows in _pair_columns(len(docs), pairs):
+            target = prepare(hashed[j])
+            for i in rows:
+                compared += 1
+                score = alignment_similarity(hashed[i], target)
+                if score >= floor():
+                    yield i, j, score
+    finally:
+        instrumentation.count("pairs_compared", compared)
+
+def _scorer(method):
+    # Pair scoring backends, called as scorer(docs, pairs, floor)
+    if method == "combined":
+        return _scored
+    if method == "align":
+        return _aligned
+    raise ValueError(f"Unknown similarity method {method!r}")
+
+def score_pairs(docs, min_similarity=0, pairs=None, vectors=None, method="combined"):
+    """Yield ``(i, j, score)`` with ``i < j`` for pairs of token lists.
+
+    Scores match ``combined_similarity(docs[i], docs[j])``. Every pair is
+    scored unless ``pairs`` restricts the run to given index pairs. Pairs
+    that cannot reach ``min_similarity`` are skipped without running
+    SequenceMatcher. Pairs are produced column by column so each document's
+    SequenceMatcher index is built once and reused against earlier documents.
+    ``vectors`` supplies the L2-normalised term rows instead of fitting a
+    vectorizer (see ``DocumentStore.unit_vectors``). ``method="align"``
+    scores with ``alignment.alignment_similarity`` instead of the blend.
+    """
+    if method == "combined":
+        scored = _scored(docs, pairs, lambda: min_similarity, vectors)
+    else:
+        scored = _scorer(method)(docs, pairs, lambda: min_similarity)
+    return instrumentation.timed_iter("score_pairs", scored)
+
+def lsh_candidates(docs, lsh):
+    """Index pairs ``(i, j)`` of token lists that collide in an empty ``lsh``,
+    or None (every pair) without one; ``score_pairs`` takes them as ``pairs``."""
+    if lsh is None:
+        return None
+    if len(lsh):
+        raise ValueError("Pass an empty MinHashLSH: candidate pairs are keyed by position in this run")
+    with instrumentation.stage("lsh_candidates"):
+        for index, words in enumerate(docs):
+            lsh.insert(index, words)
+        return lsh.candidate_pairs()
+
+def _pair_records(keys, docs, min_similarity, lsh, method="combined"):
+    scores = sorted(score_pairs(docs, min_similarity, lsh_candidates(docs, lsh), method=method))
+    return [{"file1": keys[i], "file2": keys[j], "similarity": score} for i, j, score in scores]
+
+def _tokenized(texts, tokenizer, exclude_citations):
     keys = list(texts.keys())
-    for i in range(len(keys)):
-        for j in range(i + 1, len(keys)):
-            t1 = preprocess(texts[keys[i]])
-            t2 = preprocess(texts[keys[j]])
-            score = combined_similarity(t1, t2)
-            results.append({"file1": keys[i], "file2": keys[j], "similarity": score})
-    return results
+    with instrumentation.stage("preprocess"):
+        if exclude_citations:
+            return keys, [tokenizer(mask_citations(texts[key])) for key in keys]
+        return keys, [tokenizer(texts[key]) for key in keys]
+
+def compare_all_submissions(texts, min_similarity=0, lsh=None, exclude_citations=False, method="combined"):
+    """Score submission pairs; pass an empty ``lsh.MinHashLSH`` to only score
+    the candidate pairs it generates. Its recall bound (``describe()``) is in
+    shingle-Jaccard units, not score units; build it with
+    ``MinHashLSH.for_min_similarity(min_similarity)`` (cut-offs above 50,
+    blended scores only) so it tracks the cut-off.
+    With ``exclude_citations`` cited spans are ignored when scoring.
+    ``method="align"`` scores by local alignment coverage instead of the
+    whole-document blend (see ``alignment.local_alignments`` for passages)."""
+    keys, docs = _tokenized(texts, preprocess, exclude_citations)
+    return _pair_records(keys, docs, min_similarity, lsh, method)
+
+def iter_similarities(texts, min_similarity=0, lsh=None, tokenizer=preprocess, exclude_citations=False,
+                      method="combined"):
+    """Yield ``{"file1", "file2", "similarity"}`` records as pairs are scored.
+
+    Nothing is accumulated, so memory does not grow with the number of
+    pairs; pairs below ``min_similarity`` are dropped before SequenceMatcher
+    runs. Records come in column order (each file against earlier ones).
+    Use ``tokenizer=tokenize_code`` for code.
+    """
+    keys, docs = _tokenized(texts, tokenizer, exclude_citations)
+    for i, j, score in score_pairs(docs, min_similarity, lsh_candidates(docs, lsh), method=method):
+        yield {"file1": keys[i], "file2": keys[j], "similarity": score}
+
+def top_similarities(texts, k=50, min_similarity=0, lsh=None, tokenizer=preprocess, exclude_citations=False,
+                     method="combined"):
+    """The ``k`` highest-scoring pair records, highest first.
+
+    Keeps a bounded heap; once it is full its smallest score becomes the
+    cut-off, so most remaining pairs are rejected by the cheap bounds.
+    """
+    keys, docs = _tokenized(texts, tokenizer, exclude_citations)
+    heap = []
+    floor = lambda: heap[0][0] if len(heap) >= k else min_similarity
+    scored = _scorer(method)(docs, lsh_candidates(docs, lsh), floor)
+    for i, j, score in instrumentation.timed_iter("score_pairs", scored):
+        if len(heap) < k:
+            heapq.heappush(heap, (score, -i, -j))
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, (score, -i, -j))
+    return [
+        {"file1": keys[-i], "file2": keys[-j], "similarity": score}
+        for score, i, j in sorted(heap, reverse=True)
+    ]
+
+def write_similarities(records, path, batch_size=65536):
+    """Stream pair records to a columnar file and return the row count.
+
+    ``.parquet`` paths are written batch by batch with pyarrow; anything else
+    is written as CSV. Only one batch is held in memory at a time.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([("file1", pa.string()), ("file2", pa.string()), ("similarity", pa.float64())])
+        count = 0
+        with pq.ParquetWriter(path, schema) as writer:
+            for batch in _batches(records, batch_size):
+                writer.write_batch(pa.RecordBatch.from_pylist(
+                    [{**record, "similarity": float(record["similarity"])} for record in batch], schema=schema
+                ))
+                count += len(batch)
+        return count
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["file1", "file2", "similarity"])
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    return count
+
+def _batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 def tokenize_code(code):
     try:
@@ -41,13 +265,27 @@ def tokenize_code(code):
     except:
         return []
 
-def compare_code_submissions(code_texts):
-    results = []
+def compare_code_submissions(code_texts, min_similarity=0, lsh=None, method="combined", starter_code=None,
+                             max_doc_share=None, min_cohort=50):
+    """Score code submission pairs.
+
+    ``method="winnow"`` uses the language-aware fingerprint engine in
+    ``code_similarity``, which is robust to renaming and handles C-family
+    files, and ignores fingerprints of ``starter_code`` (``{name: code}``)
+    and, in cohorts of at least ``min_cohort``, those found in more than
+    ``max_doc_share`` of the submissions (see ``compare_code_fingerprints``).
+    It already avoids scoring unrelated pairs, so it does not take ``lsh``.
+    ``"combined"`` keeps the Python-tokenize based blend and ``"align"``
+    scores the same tokens by local alignment.
+    """
+    if method == "winnow":
+        if lsh is not None:
+            raise ValueError("method='winnow' does not use LSH candidates; pass lsh=None")
+        return compare_code_fingerprints(code_texts, min_similarity, starter_code=starter_code,
+                                         max_doc_share=max_doc_share, min_cohort=min_cohort)
+    if starter_code or max_doc_share is not None:
+        raise ValueError("starter_code and max_doc_share are only supported with method='winnow'")
     keys = list(code_texts.keys())
-    for i in range(len(keys)):
-        for j in range(i + 1, len(keys)):
-            t1 = tokenize_code(code_texts[keys[i]])
-            t2 = tokenize_code(code_texts[keys[j]])
-            score = combined_similarity(t1, t2)
-            results.append({"file1": keys[i], "file2": keys[j], "similarity": score})
-    return results
+    with instrumentation.stage("preprocess"):
+        docs = [tokenize_code(code_texts[key]) for key in keys]
+    return _pair_records(keys, docs, min_similarity, lsh, method)
@@ -0,0 +1,119 @@
+# Stateful cohort comparison that only rescores pairs touched by a change
+import heapq
+import math
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from sklearn.feature_extraction.text import CountVectorizer
+from compare_text import blended_score, preprocess, score_pairs
+
+class ComparisonSession:
+    """Keeps per-document tokens and every pair score of a cohort.
+
+    Adding, replacing or removing one submission rescores only that
+    document's row of the similarity matrix; scores are the same as
+    ``compare_all_submissions`` would give. Pairs below ``min_similarity``
+    are not stored.
+    """
+
+    def __init__(self, texts=None, tokenizer=preprocess, min_similarity=0):
+        self.tokenizer = tokenizer
+        self.min_similarity = min_similarity
+        self._analyzer = CountVectorizer().build_analyzer()
+        self._order = {}
+        self._tokens = {}
+        self._terms = {}
+        self._norms = {}
+        self._scores = {}
+        self._pairs = defaultdict(set)  # name -> keys of its stored pairs
+        self._next = 0
+        if texts:
+            self._load(texts)
+
+    def _index(self, name, text):
+        if name not in self._order:
+            self._order[name] = self._next
+            self._next += 1
+        tokens = self.tokenizer(text)
+        terms = Counter(self._analyzer(" ".join(tokens)))
+        self._tokens[name] = tokens
+        self._terms[name] = terms
+        self._norms[name] = math.sqrt(sum(count * count for count in terms.values()))
+
+    def _load(self, texts):
+        # Initial cohort: one vectorized all-pairs pass
+        names = list(texts.keys())
+        for name in names:
+            self._index(name, texts[name])
+        docs = [self._tokens[name] for name in names]
+        for i, j, score in score_pairs(docs, self.min_similarity):
+            self._put((names[i], names[j]), score)
+
+    def _cosine(self, a, b):
+        terms_a, terms_b = self._terms[a], self._terms[b]
+        if not self._norms[a] or not self._norms[b]:
+            return 0.0
+        norm_a, norm_b = self._norms[a], self._norms[b]
+        # Same operation order as the normalised sparse rows in compare_text,
+        # so rounded scores agree exactly
+        shared = sorted(terms_a.keys() & terms_b.keys())
+        return sum((terms_a[term] / norm_a) * (terms_b[term] / norm_b) for term in shared) * 100
+
+    def _put(self, pair, score):
+        self._scores[pair] = score
+        self._pairs[pair[0]].add(pair)
+        self._pairs[pair[1]].add(pair)
+
+    def _drop_pairs(self, name):
+        for pair in self._pairs.pop(name, ()):
+            del self._scores[pair]
+            other = pair[1] if pair[0] == name else pair[0]
+            self._pairs[other].discard(pair)
+
+    def add(self, name, text):
+        """Add a submission, or replace its text if ``name`` already exists."""
+        if name in self._order:
+            self._drop_pairs(name)
+        self._index(name, text)
+        matcher = SequenceMatcher(None)
+        # Pairs keep compare_all_submissions orientation: earlier doc first
+        position = self._order[name]
+        later = [other for other in self._order if self._order[other] > position]
+        matcher.set_seq2(self._tokens[name])
+        for other in self._order:
+            if self._order[other] >= position:
+                continue
+            matcher.set_seq1(self._tokens[other])
+            self._store(other, name, matcher)
+        matcher.set_seq1(self._tokens[name])
+        for other in later:
+            matcher.set_seq2(self._tokens[other])
+            self._store(name, other, matcher)
+
+    def _store(self, first, second, matcher):
+        score = blended_score(matcher, self._cosine(first, second), self.min_similarity)
+        if score is not None:
+            self._put((first, second), score)
+
+    def remove(self, name):
+        del self._order[name], self._tokens[name], self._terms[name], self._norms[name]
+        self._drop_pairs(name)
+
+    def __contains__(self, name):
+        return name in self._order
+
+    def __len__(self):
+        return len(self._order)
+
+    def similarity(self, a, b):
+        """Stored score of a pair in either order (None if below the cut-off)."""
+        return self._scores.get((a, b), self._scores.get((b, a)))
+
+    def results(self):
+        """All stored pairs as ``compare_all_submissions``-style records."""
+        pairs = sorted(self._scores, key=lambda pair: (self._order[pair[0]], self._order[pair[1]]))
+        return [{"file1": a, "file2": b, "similarity": self._scores[(a, b)]} for a, b in pairs]
+
+    def top_k(self, k=10):
+        """The ``k`` most similar pairs, highest first."""
+        best = heapq.nlargest(k, self._scores.items(), key=lambda item: item[1])
+        return [{"file1": a, "file2": b, "similarity": score} for (a, b), score in best]
@@ -0,0 +1,224 @@
+# Compact cohort storage: interned vocabulary and int32 token arrays
+import json
+import os
+from collections import Counter
+from itertools import chain
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+from compare_text import lsh_candidates, preprocess, score_pairs
+
+class DocumentStore:
+    """Tokenized documents as ids into one shared vocabulary.
+
+    Every distinct token is stored once; each document is a slice of a
+    single int32 array delimited by ``offsets``, so a cohort costs about four
+    bytes per token instead of a list of string references. ``save`` writes
+    the arrays as ``.npy`` files that ``load`` memory-maps, letting several
+    processes share one archive without reading it into memory.
+
+    Scores from ``compare_all`` equal ``compare_all_submissions`` for the
+    same tokenizer.
+    """
+
+    def __init__(self, tokenizer=preprocess):
+        self.tokenizer = tokenizer
+        self.names = []
+        self._positions = {}
+        self._vocabulary = {}
+        self._terms = None
+        self._ids = np.empty(0, dtype=np.int32)
+        self._offsets = [0]
+        self._pending = []
+        self._derived = {}
+
+    @classmethod
+    def from_texts(cls, texts, tokenizer=preprocess):
+        store = cls(tokenizer)
+        for name, text in texts.items():
+            store.add(name, text)
+        return store
+
+    def add(self, name, text):
+        """Tokenize and append a document; names must be unique."""
+        if name in self._positions:
+            raise KeyError(f"Document {name!r} is already in the store")
+        vocabulary = self._vocabulary
+        ids = [vocabulary.setdefault(token, len(vocabulary)) for token in self.tokenizer(text)]
+        self._positions[name] = len(self.names)
+        self.names.append(name)
+        self._pending.append(np.array(ids, dtype=np.int32))
+        self._offsets.append(self._offsets[-1] + len(ids))
+        self._terms = None
+        self._derived.clear()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    @property
+    def vocabulary(self):
+        """Interned tokens, indexed by id."""
+        if self._terms is None:
+            self._terms = list(self._vocabulary)
+        return self._terms
+
+    @property
+    def token_ids(self):
+        """Every document's token ids, concatenated."""
+        if self._pending:
+            self._ids = np.concatenate([self._ids] + self._pending)
+            self._pending = []
+        return self._ids
+
+    @property
+    def offsets(self):
+        return np.asarray(self._offsets, dtype=np.int64)
+
+    def _position(self, doc):
+        return doc if isinstance(doc, (int, np.integer)) else self._positions[doc]
+
+    def ids(self, doc):
+        """Token ids of one document (by name or position) as an int32 view."""
+        i = self._position(doc)
+        return self.token_ids[self._offsets[i]:self._offsets[i + 1]]
+
+    def words(self, doc):
+        """Tokens of one document as strings, as the tokenizer returned them."""
+        vocabulary = self.vocabulary
+        return [vocabulary[token] for token in self.ids(doc).tolist()]
+
+    def save(self, directory):
+        """Write ``tokens.npy``, ``offsets.npy`` and ``store.json`` to ``directory``."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "tokens.npy"), self.token_ids)
+        np.save(os.path.join(directory, "offsets.npy"), self.offsets)
+        with open(os.path.join(directory, "store.json"), 'w', encoding='utf-8') as f:
+            json.dump({"names": self.names, "vocabulary": self.vocabulary,
+                       "tokenizer": getattr(self.tokenizer, "__name__", None)}, f)
+        return directory
+
+    @classmethod
+    def load(cls, directory, tokenizer=preprocess, mmap=True):
+        """Open a saved store; token arrays are memory-mapped unless ``mmap=False``.
+
+        ``tokenizer`` is only used for documents added afterwards and should
+        be the one the store was built with.
+        """
+        with open(os.path.join(directory, "store.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta["tokenizer"] not in (None, getattr(tokenizer, "__name__", None)):
+            raise ValueError(f"Store at {directory} was built with tokenizer {meta['tokenizer']!r}")
+        store = cls(tokenizer)
+        mode = "r" if mmap else None
+        store._ids = np.load(os.path.join(directory, "tokens.npy"), mmap_mode=mode)
+        store._offsets = np.load(os.path.join(directory, "offsets.npy")).tolist()
+        store.names = meta["names"]
+        store._positions = {name: i for i, name in enumerate(store.names)}
+        store._vocabulary = {token: i for i, token in enumerate(meta["vocabulary"])}
+        return store
+
+    def _cached(self, key, build):
+        if key not in self._derived:
+            self._derived[key] = build()
+        return self._derived[key]
+
+    def token_counts(self):
+        """Sparse ``documents x vocabulary`` matrix of token counts."""
+        def build():
+            ids = self.token_ids
+            rows = np.repeat(np.arange(len(self.names)), np.diff(self.offsets))
+            return csr_matrix((np.ones(ids.size), (rows, ids)), shape=(len(self.names), len(self.vocabulary)))
+        return self._cached("token_counts", build)
+
+    def unit_vectors(self):
+        """L2-normalised CountVectorizer term rows, without refitting a vectorizer.
+
+        The analyzer runs once per vocabulary entry instead of once per token;
+        since tokens never contain whitespace, the terms are the same ones
+        ``compare_text`` gets from the joined document text.
+        """
+        def build():
+            analyzer = CountVectorizer().build_analyzer()
+            per_token = [analyzer(token) for token in self.vocabulary]
+            terms = sorted(set(chain.from_iterable(per_token)))
+            if not terms:
+                return csr_matrix((len(self.names), 1))
+            column = {term: i for i, term in enumerate(terms)}
+            rows = np.repeat(np.arange(len(per_token)), [len(found) for found in per_token])
+            cols = [column[term] for term in chain.from_iterable(per_token)]
+            to_terms = csr_matrix((np.ones(len(cols)), (rows, cols)), shape=(len(per_token), len(terms)))
+            counts = (self.token_counts() @ to_terms).tocsr()
+            counts.sort_indices()
+            return normalize(counts)
+        return self._cached("unit_vectors", build)
+
+    def cosine_matrix(self):
+        """Pairwise cosine similarity (0-100), like ``compare_text.cosine_matrix``."""
+        unit = self.unit_vectors()
+        return (unit @ unit.T).tocsr() * 100
+
+    def score_pairs(self, min_similarity=0, pairs=None):
+        """``compare_text.score_pairs`` over the stored documents."""
+        return score_pairs(_IdLists(self), min_similarity, pairs, vectors=self.unit_vectors())
+
+    def compare_all(self, min_similarity=0, lsh=None):
+        """Pair records as ``compare_all_submissions`` returns them."""
+        pairs = lsh_candidates([self.words(i) for i in range(len(self))], lsh)
+        scores = sorted(self.score_pairs(min_similarity, pairs))
+        return [{"file1": self.names[i], "file2": self.names[j], "similarity": score} for i, j, score in scores]
+
+    def token_hashes(self, doc):
+        """``winnowing.token_hash`` of each token, looked up per vocabulary entry."""
+        from ngram_engine import token_hash_array
+        vocabulary_hashes = self._cached("token_hashes", lambda: token_hash_array(self.vocabulary))
+        return vocabulary_hashes[self.ids(doc)]
+
+    def ngram_hashes(self, doc, n=3):
+        """64-bit n-gram hashes compatible with ``ngram_engine`` and ``winnowing``."""
+        from ngram_engine import ngram_hash_array
+        return ngram_hash_array(self.token_hashes(doc), n)
+
+    def ngram_similarity(self, doc_a, doc_b, n=3, metric="jaccard"):
+        """Jaccard (default) or containment of ``doc_a`` in ``doc_b`` over token n-grams."""
+        from ngram_engine import _similarity
+        return _similarity(np.unique(self.ngram_hashes(doc_a, n)), np.unique(self.ngram_hashes(doc_b, n)), metric)
+
+    def word_frequencies(self, doc, top=None):
+        """Token counts of one document, most common first."""
+        counts = np.bincount(self.ids(doc))
+        found = np.flatnonzero(counts)
+        order = found[np.argsort(-counts[found], kind="stable")][:top]
+        vocabulary = self.vocabulary
+        return Counter({vocabulary[token]: int(counts[token]) for token in order.tolist()})
+
+    def statistics(self, doc):
+        """Token-level statistics of one document and its ten most common tokens.
+
+        Counts are of the tokenizer's output (for ``preprocess``, without
+        stopwords), hence not the word counts of
+        ``text_analysis.generate_text_statistics``, which also gives sentence
+        and character counts from the raw text.
+        """
+        ids = self.ids(doc)
+        stats = {
+            'Token Count': int(ids.size),
+            'Unique Tokens': int(np.unique(ids).size),
+        }
+        return stats, dict(self.word_frequencies(doc, top=10))
+
+class _IdLists:
+    # Sequence view handing SequenceMatcher one document's ids at a time.
+    # Ids map one-to-one onto tokens, so matching blocks (and ratio()) are
+    # the same as on the token strings.
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, i):
+        return self.store.ids(i).tolist()
@@ -1,46 +1,297 @@
 import os
+import hashlib
+import multiprocessing
+import signal
+import subprocess
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from multiprocessing.connection import wait
 import cv2
 import pytesseract
 import pdfplumber
-from PIL import Image
+from pdfminer.pdfpage import PDFPage
+from pdfplumber.page import Page
+import instrumentation
 
-def extract_text_from_file(path):
+CODE_EXTENSIONS = (".py", ".java", ".cpp", ".c")
+IMAGE_EXTENSIONS = (".jpg", ".png")
+# Files parsed or OCRed in a worker process; everything else is a plain read
+WORKER_EXTENSIONS = (".pdf",) + IMAGE_EXTENSIONS
+OCR_CONFIG = '--oem 1 --psm 6'
+OCR_SCALE = 1.5
+OCR_BLUR_KERNEL = 5
+OCR_BLOCK_SIZE = 31
+OCR_THRESHOLD_C = 2
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hex SHA-256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+@lru_cache(maxsize=None)
+def extractor_settings(ext):
+    """Settings that change the output of the extractor used for ``ext``."""
+    if ext == ".pdf":
+        return {"extractor": "pdfplumber", "version": pdfplumber.__version__}
+    if ext in IMAGE_EXTENSIONS:
+        return {
+            "extractor": "tesseract",
+            "version": str(pytesseract.get_tesseract_version()),
+            "config": OCR_CONFIG,
+            "scale": OCR_SCALE,
+            "blur_kernel": OCR_BLUR_KERNEL,
+            "block_size": OCR_BLOCK_SIZE,
+            "threshold_c": OCR_THRESHOLD_C,
+        }
+    return None
+
+def extract_text_from_file(path, cache=None):
+    """Return ``(text, image_path, confidence)`` for a submission file.
+
+    With an ``ExtractionCache``, PDF and image results are looked up by file
+    content and extractor settings, so unchanged files skip parsing and OCR.
+    Failed extractions (confidence 0) are not cached.
+    """
     ext = os.path.splitext(path)[1].lower()
+    settings = extractor_settings(ext) if cache is not None else None
+    if settings is None:
+        return _extract(path, ext)
+
+    key = cache.key(file_sha256(path), settings)
+    cached = cache.get(key)
+    if cached is not None:
+        text, confidence = cached
+        return text, path if ext in IMAGE_EXTENSIONS else None, confidence
+    text, image_path, confidence = _extract(path, ext)
+    if confidence > 0:
+        cache.put(key, text, confidence)
+    return text, image_path, confidence
+
+def _failed_result(path, ext):
+    return "", path if ext in IMAGE_EXTENSIONS else None, 0
+
+def _extract_worker(conn, path, ext):
+    # Own process group, so a timeout also kills the tesseract child process
+    if hasattr(os, "setsid"):
+        os.setsid()
+    try:
+        result = _extract(path, ext)
+    except Exception:
+        result = _failed_result(path, ext)
+    conn.send(result)
+    conn.close()
+
+@lru_cache(maxsize=None)
+def _worker_context():
+    # Never fork: batches also start from job-server threads, and a forked
+    # child can inherit a lock (logging, instrumentation) another thread held.
+    # The fork server preloads this module so each worker starts quickly.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["extract_text"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+def _cache_key(path, ext, cache):
+    # Hashing the file or asking Tesseract for its version can fail for one
+    # file (unreadable, OCR not installed); that file then runs uncached and
+    # its worker reports the failure like any other.
+    if cache is None:
+        return None
+    try:
+        settings = extractor_settings(ext)
+        return cache.key(file_sha256(path), settings) if settings is not None else None
+    except Exception:
+        return None
+
+def _kill(proc):
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+    else:
+        proc.terminate()
+    proc.join()
+
+def extract_batch(paths, max_workers=None, timeout=120, cache=None):
+    """Extract many files in parallel, yielding ``(path, result)`` as each finishes.
+
+    Each PDF and image runs in its own worker process, at most
+    ``max_workers`` (default: CPU count) at a time, and is killed if still
+    running after ``timeout`` seconds. Text and code files are only read,
+    so they are read here without a worker. Files that time out or raise
+    yield ``("", image_path, 0)``, so a confidence of 0 marks a failed
+    extraction. Cached results are yielded without starting a worker.
+    """
+    context = _worker_context()
+    max_workers = max_workers or os.cpu_count() or 1
+    pending = deque(paths)
+    running = {}
+    try:
+        while pending or running:
+            while pending and len(running) < max_workers:
+                path = pending.popleft()
+                ext = os.path.splitext(path)[1].lower()
+                if ext not in WORKER_EXTENSIONS:
+                    try:
+                        result = _extract(path, ext)
+                    except Exception:
+                        result = _failed_result(path, ext)
+                    yield path, result
+                    continue
+                key = _cache_key(path, ext, cache)
+                if key is not None:
+                    cached = cache.get(key)
+                    if cached is not None:
+                        text, confidence = cached
+                        yield path, (text, path if ext in IMAGE_EXTENSIONS else None, confidence)
+                        continue
+                reader, writer = context.Pipe(duplex=False)
+                proc = context.Process(target=_extract_worker, args=(writer, path, ext), daemon=True)
+                proc.start()
+                writer.close()
+                running[reader] = (proc, path, ext, time.monotonic() + timeout, key)
+            if not running:
+                continue
 
+            next_deadline = min(entry[3] for entry in running.values())
+            for reader in wait(list(running), timeout=max(0, next_deadline - time.monotonic())):
+                proc, path, ext, _, key = running.pop(reader)
+                try:
+                    result = reader.recv()
+                except EOFError:  # worker died without answering
+                    result = _failed_result(path, ext)
+                reader.close()
+                proc.join()
+                _count_extracted(result)  # counters recorded in the worker are lost with it
+                if key is not None and result[2] > 0:
+                    cache.put(key, result[0], result[2])
+                yield path, result
+
+            now = time.monotonic()
+            for reader, (proc, path, ext, deadline, _) in list(running.items()):
+                if deadline <= now:
+                    del running[reader]
+                    instrumentation.count("extraction_timeouts")
+                    _kill(proc)
+                    reader.close()
+                    yield path, _failed_result(path, ext)
+    finally:
+        for reader, (proc, *_) in running.items():
+            _kill(proc)
+            reader.close()
+
+def _extract(path, ext):
+    with instrumentation.stage("extract_" + (ext.lstrip(".") or "none")):
+        result = _extract_uncounted(path, ext)
+    _count_extracted(result)
+    return result
+
+def _count_extracted(result):
+    if instrumentation.enabled():
+        instrumentation.count("files_extracted")
+        instrumentation.count("bytes_extracted", len(result[0].encode("utf-8")))
+
+def _extract_uncounted(path, ext):
     if ext == ".txt":
         with open(path, "r", encoding="utf-8", errors="ignore") as f:
             return f.read().strip(), None, 100
 
     elif ext == ".pdf":
-        with pdfplumber.open(path) as pdf:
-            text = "\n".join([page.extract_text() or "" for page in pdf.pages])
-            return text.strip(), None, 100
+        return "\n".join(iter_pdf_pages(path)).strip(), None, 100
 
-    elif ext in [".jpg", ".png"]:
+    elif ext in IMAGE_EXTENSIONS:
         return extract_text_from_image(path)
 
-    elif ext in [".py", ".java", ".cpp", ".c"]:
+    elif ext in CODE_EXTENSIONS:
         with open(path, "r", encoding="utf-8", errors="ignore") as f:
             return f.read().strip(), None, 100
 
     return "", None, 100  # fallback
 
-def extract_text_from_image(img_path):
-    image = cv2.imread(img_path)
+def iter_pdf_pages(path):
+    """Yield the text of each PDF page in order.
+
+    Pages are built one at a time from the page tree, as ``pdf.pages`` would
+    build them all up front and keep them referenced, and each page's parsed
+    layout is released once its text has been yielded, so memory stays
+    bounded by one page regardless of document length.
+    """
+    with pdfplumber.open(path) as pdf:
+        doctop = 0
+        for number, page_object in enumerate(PDFPage.create_pages(pdf.doc), 1):
+            page = Page(pdf, page_object, page_number=number, initial_doctop=doctop)
+            doctop += page.height
+            text = page.extract_text() or ""
+            page.close()
+            yield text
+
+def iter_text_chunks(path, cache=None):
+    """Yield a file's text incrementally: page by page for PDFs, in one
+    chunk for every other type."""
+    if os.path.splitext(path)[1].lower() == ".pdf" and cache is None:
+        yield from iter_pdf_pages(path)
+    else:
+        yield extract_text_from_file(path, cache=cache)[0]
+
+def preprocess_image(image, scale=OCR_SCALE, blur_kernel=OCR_BLUR_KERNEL,
+                     block_size=OCR_BLOCK_SIZE, threshold_c=OCR_THRESHOLD_C):
+    """Grayscale, upscale, blur and adaptive-threshold a BGR image array."""
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    gray = cv2.resize(gray, None, fx=1.5, fy=1.5, interpolation=cv2.INTER_LINEAR)
-    blur = cv2.GaussianBlur(gray, (5, 5), 0)
-    thresh = cv2.adaptiveThreshold(
-        blur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 2
+    gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+    blur = cv2.GaussianBlur(gray, (blur_kernel, blur_kernel), 0)
+    return cv2.adaptiveThreshold(
+        blur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block_size, threshold_c
     )
 
-    temp_path = "temp_processed.png"
-    cv2.imwrite(temp_path, thresh)
+@instrumentation.timed("ocr")
+def _tesseract(image):
+    # pytesseract.image_to_string saves its input to a temp file first;
+    # piping an in-memory PNG to `tesseract stdin stdout` writes nothing
+    _, png = cv2.imencode(".png", image)
+    command = [pytesseract.pytesseract.tesseract_cmd, "stdin", "stdout"] + OCR_CONFIG.split()
+    try:
+        result = subprocess.run(command, input=png.tobytes(), capture_output=True)
+    except FileNotFoundError:
+        raise pytesseract.TesseractNotFoundError()
+    if result.returncode:
+        raise pytesseract.TesseractError(result.returncode, result.stderr.decode('utf-8', 'replace').strip())
+    return result.stdout.decode('utf-8')
 
-    text = pytesseract.image_to_string(Image.open(temp_path), config='--oem 1 --psm 6')
-    os.remove(temp_path)
+def extract_text_from_image(img_path, **settings):
+    """OCR an image file; ``settings`` are passed to ``preprocess_image``.
 
-    return text.strip(), img_path, 100  # fixed 100% confidence
+    The thresholded image is piped to Tesseract's stdin, so no temp file is
+    written and calls are safe to run concurrently.
+    """
+    image = cv2.imread(img_path)
+    if image is None:
+        return "", img_path, 0
+    thresh = preprocess_image(image, **settings)
+    text = _tesseract(thresh)
 
+    return text.strip(), img_path, 100  # fixed 100% confidence
 
+def extract_text_from_images(img_paths, max_workers=4, **settings):
+    """OCR many images concurrently in this process.
 
+    Yields ``(img_path, (text, image_path, confidence))`` as each finishes.
+    Threads are enough here: OpenCV releases the GIL and Tesseract runs as a
+    subprocess. An image whose OCR raises yields ``("", img_path, 0)``, as
+    in ``extract_batch``.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(extract_text_from_image, path, **settings): path for path in img_paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception:
+                result = "", path, 0
+            yield path, result
@@ -0,0 +1,117 @@
+# Content-addressed cache for extracted PDF and OCR text
+import hashlib
+import json
+import os
+from collections import OrderedDict
+import instrumentation
+
+class ExtractionCache:
+    """Two-tier cache of extraction results keyed by content hash and settings.
+
+    Recent entries live in an in-memory LRU of ``max_memory_entries``; every
+    entry is also written to ``cache_dir``. The disk total is counted at
+    startup and kept up to date on writes; once it goes over
+    ``max_disk_bytes`` the directory is rescanned and the least recently
+    used files are deleted down to 90% of the cap, so a full cache is not
+    rescanned on every write.
+    """
+
+    def __init__(self, cache_dir=".extraction_cache", max_memory_entries=256, max_disk_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    @staticmethod
+    def key(content_hash, settings):
+        """Cache key for a file's content hash and the extractor settings used."""
+        payload = json.dumps([content_hash, settings], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return ``(text, confidence)`` or None."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            instrumentation.count("extraction_cache_memory_hits")
+            return self._memory[key]
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            instrumentation.count("extraction_cache_misses")
+            return None
+        os.utime(path)  # mark as recently used for disk eviction
+        value = (entry["text"], entry["confidence"])
+        self._remember(key, value)
+        self.disk_hits += 1
+        instrumentation.count("extraction_cache_disk_hits")
+        return value
+
+    def put(self, key, text, confidence):
+        self._remember(key, (text, confidence))
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"text": text, "confidence": confidence}, f)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        self._disk_bytes += os.path.getsize(tmp_path) - replaced
+        os.replace(tmp_path, path)
+        if self._disk_bytes > self.max_disk_bytes:
+            self._trim_disk()
+
+    def _disk_entries(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                yield stat.st_mtime, stat.st_size, entry.path
+
+    def _trim_disk(self):
+        # Rescan rather than trust the running total: other processes may
+        # share the directory
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9 if total > self.max_disk_bytes else total
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._disk_bytes = total
+
+    def clear(self):
+        self._memory.clear()
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                os.remove(entry.path)
+        self._disk_bytes = 0
+
+    def stats(self):
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+        }
@@ -0,0 +1,191 @@
+# Persistent index of winnowed fingerprints for previously checked submissions
+import os
+import sqlite3
+import time
+from compare_text import preprocess, tokenize_code
+from extract_text import CODE_EXTENSIONS, extract_text_from_file, file_sha256
+from winnowing import Fingerprinter, fingerprint
+
+_SIGN_BIT = 1 << 63
+
+def _to_sql(h):
+    # SQLite integers are signed 64-bit
+    return h - (1 << 64) if h >= _SIGN_BIT else h
+
+def tokens_for(name, text):
+    """Tokenize text the way the comparison path would, based on file extension."""
+    if os.path.splitext(name)[1].lower() in CODE_EXTENSIONS:
+        return tokenize_code(text)
+    return preprocess(text)
+
+class FingerprintIndex:
+    """On-disk (SQLite) index of winnowed k-gram fingerprints keyed by content hash.
+
+    Files already in the index are recognised by their SHA-256 and never
+    extracted or tokenized again. Eviction is applied by ``compact()``:
+    documents not seen for ``max_age_days`` are dropped, then the least
+    recently seen ones until at most ``max_documents`` remain.
+    """
+
+    def __init__(self, path="fingerprints.db", k=5, window=4, max_documents=None, max_age_days=None,
+                 cache=None):
+        self.path = path
+        self.k = k
+        self.window = window
+        self.max_documents = max_documents
+        self.max_age_days = max_age_days
+        self.cache = cache
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS documents (
+                content_hash TEXT PRIMARY KEY,
+                name TEXT,
+                fingerprint_count INTEGER,
+                added_at REAL,
+                last_seen REAL
+            );
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                hash INTEGER,
+                content_hash TEXT,
+                position INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS fingerprints_hash ON fingerprints (hash);
+            CREATE INDEX IF NOT EXISTS fingerprints_doc ON fingerprints (content_hash);
+        """)
+        for key, value in (("k", k), ("window", window)):
+            self.conn.execute("INSERT OR IGNORE INTO meta VALUES (?, ?)", (key, str(value)))
+            stored = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0]
+            if int(stored) != value:
+                raise ValueError(f"Index at {path} was built with {key}={stored}, not {value}")
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def __contains__(self, content_hash):
+        return self.conn.execute(
+            "SELECT 1 FROM documents WHERE content_hash = ?", (content_hash,)
+        ).fetchone() is not None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def add_text(self, content_hash, name, text):
+        """Fingerprint and store a document unless its hash is already indexed."""
+        now = time.time()
+        if content_hash in self:
+            self.conn.execute("UPDATE documents SET last_seen = ? WHERE content_hash = ?", (now, content_hash))
+            self.conn.commit()
+            return False
+        fps = fingerprint(tokens_for(name, text), self.k, self.window)
+        self.conn.execute(
+            "INSERT INTO documents VALUES (?, ?, ?, ?, ?)", (content_hash, name, len(fps), now, now)
+        )
+        self.conn.executemany(
+            "INSERT INTO fingerprints VALUES (?, ?, ?)",
+            ((_to_sql(h), content_hash, position) for h, position in fps),
+        )
+        self.conn.commit()
+        return True
+
+    def add_file(self, path, name=None):
+        """Index a file, extracting text only if its content hash is new.
+
+        Returns the content hash.
+        """
+        content_hash = file_sha256(path)
+        if content_hash in self:
+            self.add_text(content_hash, name or os.path.basename(path), "")
+        else:
+            text, _, _ = extract_text_from_file(path, cache=self.cache)
+            self.add_text(content_hash, name or os.path.basename(path), text)
+        return content_hash
+
+    def query_hashes(self, hashes, exclude=None, limit=10):
+        """Rank indexed documents by how many of ``hashes`` they share.
+
+        Each result holds the document's content hash and name, the number of
+        shared fingerprints, ``containment`` (% of the query's fingerprints
+        found in the document) and ``coverage`` (% of the document's
+        fingerprints found in the query).
+        """
+        hashes = {_to_sql(h) for h in hashes}
+        if not hashes:
+            return []
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS query (hash INTEGER PRIMARY KEY)")
+        self.conn.execute("DELETE FROM query")
+        self.conn.executemany("INSERT INTO query VALUES (?)", ((h,) for h in hashes))
+        rows = self.conn.execute("""
+            SELECT d.content_hash, d.name, d.fingerprint_count, COUNT(DISTINCT f.hash) AS shared
+            FROM query q
+            JOIN fingerprints f ON f.hash = q.hash
+            JOIN documents d ON d.content_hash = f.content_hash
+            WHERE d.content_hash != ?
+            GROUP BY d.content_hash
+            ORDER BY shared DESC
+            LIMIT ?
+        """, (exclude or "", limit)).fetchall()
+        return [
+            {"content_hash": h, "name": name, "shared": shared,
+             "containment": round(shared / len(hashes) * 100, 2),
+             "coverage": round(shared / count * 100, 2) if count else 0.0}
+            for h, name, count, shared in rows
+        ]
+
+    def stored_hashes(self, content_hash):
+        return [row[0] for row in self.conn.execute(
+            "SELECT hash FROM fingerprints WHERE content_hash = ?", (content_hash,)
+        )]
+
+    def check_file(self, path, name=None, limit=10):
+        """Add a submission to the index and return its closest earlier matches."""
+        content_hash = self.add_file(path, name)
+        return self.query_hashes(self.stored_hashes(content_hash), exclude=content_hash, limit=limit)
+
+    def check_stream(self, chunks, name="", stop_at=None, query_every=10, limit=10):
+        """Query the index while consuming text chunks (e.g. ``iter_pdf_pages``).
+
+        Fingerprints are built incrementally. When ``stop_at`` is set, the
+        index is queried every ``query_every`` chunks and reading stops as
+        soon as an indexed document's ``coverage`` reaches ``stop_at``;
+        coverage only grows as more text is read, so the verdict cannot
+        change. Returns ``(matches, finished)``. The streamed document is not
+        added to the index.
+        """
+        fingerprinter = Fingerprinter(self.k, self.window)
+        hashes = set()
+        for count, chunk in enumerate(chunks, 1):
+            hashes.update(h for h, _ in fingerprinter.feed(tokens_for(name, chunk)))
+            if stop_at is not None and count % query_every == 0:
+                matches = self.query_hashes(hashes, limit=limit)
+                if any(match["coverage"] >= stop_at for match in matches):
+                    return matches, False
+        hashes.update(h for h, _ in fingerprinter.finish())
+        return self.query_hashes(hashes, limit=limit), True
+
+    def compact(self):
+        """Apply the eviction policy and reclaim space. Returns evicted count."""
+        before = len(self)
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * 86400
+            self.conn.execute("DELETE FROM documents WHERE last_seen < ?", (cutoff,))
+        if self.max_documents is not None:
+            self.conn.execute("""
+                DELETE FROM documents WHERE content_hash IN (
+                    SELECT content_hash FROM documents
+                    ORDER BY last_seen DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_documents,))
+        self.conn.execute(
+            "DELETE FROM fingerprints WHERE content_hash NOT IN (SELECT content_hash FROM documents)"
+        )
+        self.conn.commit()
+        self.conn.execute("VACUUM")
+        return before - len(self)
@@ -1,16 +1,58 @@
 import html
-import difflib
-def highlight_matches(text1, text2):
-    matcher = difflib.SequenceMatcher(None, text1, text2)
-    matched_text1 = ""
-    matched_text2 = ""
+import re
+import instrumentation
+from winnowing import kgram_hashes
 
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag == 'equal':
-            matched_text1 += f'<span style="background-color: #c6f6d5">{text1[i1:i2]}</span>'
-            matched_text2 += f'<span style="background-color: #c6f6d5">{text2[j1:j2]}</span>'
+HIGHLIGHT_STYLE = "background-color: #c6f6d5"
+_WORD = re.compile(r'\S+')
+
+def _words(text):
+    spans = [m.span() for m in _WORD.finditer(text)]
+    tokens = [text[start:end].strip('.,;:!?()[]{}"\'').lower() for start, end in spans]
+    return tokens, spans
+
+def _matched_spans(hashes, shared, k, word_spans):
+    # Merge the word ranges of consecutive or overlapping shared k-grams,
+    # then convert them to character offsets.
+    ranges = []
+    for i, h in enumerate(hashes):
+        if h not in shared:
+            continue
+        if ranges and i <= ranges[-1][1]:
+            ranges[-1][1] = i + k
         else:
-            matched_text1 += text1[i1:i2]
-            matched_text2 += text2[j1:j2]
+            ranges.append([i, i + k])
+    return [(word_spans[start][0], word_spans[end - 1][1]) for start, end in ranges]
+
+def match_spans(text1, text2, k=5):
+    """Character spans of each text that also occur in the other text.
+
+    A passage counts as matched when it is covered by runs of ``k`` words
+    (case and surrounding punctuation ignored) present in both texts. Runs
+    are compared by hash, so this is linear in the length of the texts.
+    Returns two lists of ``(start, end)`` offsets.
+    """
+    tokens1, spans1 = _words(text1)
+    tokens2, spans2 = _words(text2)
+    k = max(1, min(k, len(tokens1), len(tokens2)))
+    hashes1 = kgram_hashes(tokens1, k)
+    hashes2 = kgram_hashes(tokens2, k)
+    shared = set(hashes1).intersection(hashes2)
+    return (_matched_spans(hashes1, shared, k, spans1),
+            _matched_spans(hashes2, shared, k, spans2))
+
+def render_spans(text, spans):
+    """HTML-escape ``text`` and wrap each ``(start, end)`` span in a highlight."""
+    parts = []
+    position = 0
+    for start, end in spans:
+        parts.append(html.escape(text[position:start]))
+        parts.append(f'<span style="{HIGHLIGHT_STYLE}">{html.escape(text[start:end])}</span>')
+        position = end
+    parts.append(html.escape(text[position:]))
+    return "".join(parts)
 
-    return matched_text1, matched_text2
+@instrumentation.timed("highlight")
+def highlight_matches(text1, text2, k=5):
+    spans1, spans2 = match_spans(text1, text2, k)
+    return render_spans(text1, spans1), render_spans(text2, spans2)
@@ -0,0 +1,165 @@
+# Per-stage timers, counters and optional cProfile capture for the pipeline
+#
+# Disabled by default: stage() then returns a shared no-op context and
+# count() returns at once. Turn it on with PLAGIARISM_INSTRUMENT=1 or enable().
+#
+#   import instrumentation
+#   instrumentation.enable()
+#   compare_all_submissions(texts)
+#   print(instrumentation.to_prometheus())
+import cProfile
+import functools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_enabled = os.environ.get("PLAGIARISM_INSTRUMENT", "0") == "1"
+_lock = threading.Lock()
+_stages = {}  # name -> [calls, total seconds, max seconds]
+_counters = {}
+_NULL = nullcontext()
+
+def enable(on=True):
+    """Switch recording on (or off with ``on=False``)."""
+    global _enabled
+    _enabled = on
+
+def enabled():
+    return _enabled
+
+def reset():
+    """Forget everything recorded so far."""
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+def _record(name, seconds):
+    with _lock:
+        entry = _stages.get(name)
+        if entry is None:
+            _stages[name] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, time.perf_counter() - self.start)
+        return False
+
+def stage(name):
+    """Context manager timing one run of stage ``name``.
+
+    Stages may nest (``vectorize`` runs inside ``score_pairs``), so their
+    totals are not meant to add up to the wall time.
+    """
+    return _Stage(name) if _enabled else _NULL
+
+def timed(name):
+    """Decorator form of ``stage`` for whole functions."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def timed_iter(name, iterable):
+    """Wrap a generator so only the time spent producing items is recorded,
+    not the time the consumer spends between them."""
+    if not _enabled:
+        return iterable
+    return _timed_items(name, iter(iterable))
+
+def _timed_items(name, iterator):
+    elapsed = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        _record(name, elapsed)
+
+def count(name, amount=1):
+    """Add ``amount`` to counter ``name``."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+@contextmanager
+def profile(path=None):
+    """Run the block under cProfile and yield the profiler.
+
+    With ``path`` the stats are dumped there for ``pstats`` or snakeviz.
+    Works whether or not timers are enabled.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+
+def snapshot():
+    """Everything recorded so far as plain dicts."""
+    with _lock:
+        return {
+            "stages": {
+                name: {"calls": calls, "total_seconds": round(total, 6), "max_seconds": round(longest, 6)}
+                for name, (calls, total, longest) in sorted(_stages.items())
+            },
+            "counters": dict(sorted(_counters.items())),
+        }
+
+def to_json(path=None):
+    """``snapshot()`` as JSON; written to ``path`` when given."""
+    data = json.dumps(snapshot(), indent=4)
+    if path:
+        with open(path, 'w') as f:
+            f.write(data)
+    return data
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+def to_prometheus(prefix="plagiarism"):
+    """``snapshot()`` in the Prometheus text exposition format."""
+    data = snapshot()
+    lines = [
+        f"# HELP {prefix}_stage_seconds Time spent per pipeline stage.",
+        f"# TYPE {prefix}_stage_seconds summary",
+    ]
+    for name, stats in data["stages"].items():
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {stats["total_seconds"]}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stats["calls"]}')
+    for name, value in data["counters"].items():
+        metric = f"{prefix}_{_metric_name(name)}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,152 @@
+# Local HTTP API for the job queue, and client helpers for the UI
+#
+#   POST   /jobs        {"source": "<dir or manifest>", ...run_check options}
+#   GET    /jobs        all known jobs
+#   GET    /jobs/<id>   one job: status, progress, result
+#   DELETE /jobs/<id>   cancel a job
+#   GET    /metrics     instrumentation counters in Prometheus text format
+#
+# The server reads submissions from its own filesystem, so it binds to
+# localhost unless told otherwise, only accepts JSON bodies (a browser
+# cannot send those cross-site without a preflight) and only touches paths
+# under the directories it was started with.
+import json
+import os
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import instrumentation
+from jobs import BATCH_OUTPUT_DIR, JobQueue, discover_submissions
+
+CHECK_OPTIONS = {
+    "output_dir", "min_similarity", "top_k", "use_lsh", "exclude_citations",
+    "text_method", "code_method", "workers", "timeout", "cache_dir", "cohort", "starter",
+    "max_doc_share", "min_cohort",
+}
+# Options naming submissions to read, and directories the check writes to
+INPUT_OPTIONS = ("source", "starter")
+OUTPUT_OPTIONS = ("output_dir", "cache_dir")
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    queue = None  # set by make_server
+    roots = ()
+
+    def _send(self, status, payload, content_type="application/json"):
+        body = payload if isinstance(payload, str) else json.dumps(payload)
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _allowed(self, path):
+        path = os.path.realpath(path)
+        return any(os.path.commonpath([root, path]) == root for root in self.roots)
+
+    def _outside_roots(self, request):
+        # Returns the first offending path, if any. Inputs are then checked
+        # file by file, since a manifest can list paths anywhere. Jobs write
+        # under the default output directory unless given one.
+        named = [] if request.get("output_dir") else [BATCH_OUTPUT_DIR]
+        for option in INPUT_OPTIONS + OUTPUT_OPTIONS:
+            value = request.get(option)
+            if value is not None:
+                named += list(value) if isinstance(value, (list, tuple)) else [value]
+        for path in named:
+            if not self._allowed(path):
+                return path
+        for option in INPUT_OPTIONS:
+            if request.get(option) is not None:
+                for path in discover_submissions(request[option]).values():
+                    if not self._allowed(path):
+                        return path
+        return None
+
+    def _job_id(self):
+        parts = self.path.strip("/").split("/")
+        return parts[1] if len(parts) == 2 and parts[0] == "jobs" else None
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/jobs":
+            return self._send(200, [job.to_dict() for job in self.queue.jobs()])
+        if self.path == "/metrics":
+            return self._send(200, instrumentation.to_prometheus(), "text/plain; version=0.0.4")
+        job_id = self._job_id()
+        try:
+            return self._send(200, self.queue.get(job_id).to_dict())
+        except KeyError:
+            return self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._send(404, {"error": "not found"})
+        if self.headers.get_content_type() != "application/json":
+            return self._send(415, {"error": "expected Content-Type: application/json"})
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not isinstance(request, dict) or "source" not in request:
+                raise ValueError
+        except ValueError:
+            return self._send(400, {"error": "expected a JSON object with a 'source'"})
+        unknown = set(request) - CHECK_OPTIONS - {"source"}
+        if unknown:
+            return self._send(400, {"error": f"unknown options: {sorted(unknown)}"})
+        try:
+            outside = self._outside_roots(request)
+        except (OSError, ValueError, TypeError) as e:
+            return self._send(400, {"error": f"cannot read submissions: {e}"})
+        if outside is not None:
+            return self._send(403, {"error": f"path outside the served directories: {outside}"})
+        job = self.queue.submit_check(request.pop("source"), **request)
+        return self._send(202, job.to_dict())
+
+    def do_DELETE(self):
+        # Cancelling a finished job is a no-op; the returned status shows it
+        try:
+            self.queue.cancel(self._job_id())
+            return self._send(200, self.queue.get(self._job_id()).to_dict())
+        except KeyError:
+            return self._send(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+def make_server(host="127.0.0.1", port=8765, max_jobs=2, roots=None):
+    """An HTTP server bound to ``host:port`` with its own ``JobQueue``
+    running at most ``max_jobs`` checks at once. Call ``serve_forever()``.
+
+    Jobs may only read submissions from, and write results under, the
+    directories in ``roots`` (default: the current directory).
+    """
+    roots = tuple(os.path.realpath(root) for root in (roots or [os.getcwd()]))
+    handler = type("Handler", (JobRequestHandler,), {"queue": JobQueue(max_workers=max_jobs), "roots": roots})
+    return ThreadingHTTPServer((host, port), handler)
+
+def _request(url, method="GET", payload=None):
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(url, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+def submit_job(base_url, source, **options):
+    """Queue a check on the server and return the job dict (with its ``id``)."""
+    return _request(f"{base_url.rstrip('/')}/jobs", "POST", {"source": source, **options})
+
+def get_job(base_url, job_id):
+    return _request(f"{base_url.rstrip('/')}/jobs/{job_id}")
+
+def cancel_job(base_url, job_id):
+    return _request(f"{base_url.rstrip('/')}/jobs/{job_id}", "DELETE")
+
+def wait_for_job(base_url, job_id, poll_interval=1.0, timeout=None):
+    """Poll until the job is done, failed or cancelled and return it."""
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while True:
+        job = get_job(base_url, job_id)
+        if job["status"] in ("done", "failed", "cancelled"):
+            return job
+        if deadline is not None and time.monotonic() >= deadline:
+            return job
+        time.sleep(poll_interval)
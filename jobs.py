@@ -0,0 +1,287 @@
+# Batch plagiarism checks and a bounded queue that runs them in the background
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import instrumentation
+from extract_text import CODE_EXTENSIONS, IMAGE_EXTENSIONS, extract_batch, extract_text_from_file
+
+SUBMISSION_EXTENSIONS = (".txt", ".pdf") + IMAGE_EXTENSIONS + CODE_EXTENSIONS
+BATCH_OUTPUT_DIR = "reports/batch"
+
+def discover_submissions(source):
+    """Return ``{name: path}`` for a directory, a manifest file or a list of paths.
+
+    Directories are walked recursively and names are paths relative to the
+    directory. A manifest is a ``.json`` list of paths or a text file with
+    one path per line (blank lines and ``#`` comments skipped); relative
+    paths are resolved against the manifest's directory. Only files with a
+    supported extension are kept.
+    """
+    if isinstance(source, (list, tuple)):
+        paths = list(source)
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths]) if paths else ""
+    elif os.path.isdir(source):
+        root = source
+        paths = sorted(
+            os.path.join(directory, name)
+            for directory, _, names in os.walk(source)
+            for name in names
+        )
+    else:
+        root = os.path.dirname(os.path.abspath(source))
+        with open(source, 'r', encoding='utf-8') as f:
+            if source.endswith(".json"):
+                entries = json.load(f)
+            else:
+                entries = [line.strip() for line in f]
+        paths = [os.path.join(root, entry) for entry in entries if entry and not entry.startswith("#")]
+        missing = [path for path in paths if not os.path.isfile(path)]
+        if missing:
+            raise FileNotFoundError(f"Manifest {source} lists missing files: {missing[:5]}")
+
+    submissions = {}
+    for path in paths:
+        if os.path.splitext(path)[1].lower() in SUBMISSION_EXTENSIONS:
+            name = os.path.relpath(os.path.abspath(path), os.path.abspath(root)) if root else path
+            submissions[name.replace(os.sep, "/")] = path
+    return submissions
+
+def run_check(source, output_dir=BATCH_OUTPUT_DIR, min_similarity=0, top_k=None, use_lsh=False,
+              exclude_citations=False, text_method="combined", code_method="winnow", workers=None, timeout=120,
+              cache_dir=None, cohort=False, starter=None, max_doc_share=None, min_cohort=50, progress=None):
+    """Extract, compare and report on a cohort of submissions.
+
+    ``source`` is anything ``discover_submissions`` accepts. Text and code
+    files are compared separately. Pair results go to ``text_pairs.csv`` and
+    ``code_pairs.csv`` in ``output_dir`` (a Parquet cohort store under
+    ``cohort/`` instead, for text, with ``cohort=True``); ``summary.json``
+    records what was done. ``top_k`` keeps only the best text pairs;
+    ``use_lsh`` prunes pairs that cannot reach ``min_similarity`` (which
+    must then be above 50, with the ``"combined"`` text method);
+    ``text_method`` and ``code_method`` pick the scoring backends.
+    ``starter`` (a directory or manifest of code handed out with the
+    assignment) is ignored when comparing code with ``"winnow"``, as are
+    fingerprints in more than ``max_doc_share`` of the code submissions
+    once there are at least ``min_cohort`` of them.
+    ``progress(stage, done, total)`` is called as work completes. Returns
+    the summary dict.
+    """
+    from compare_text import compare_code_submissions, iter_similarities, top_similarities, write_similarities
+    from extraction_cache import ExtractionCache
+    from lsh import MinHashLSH
+    from report_generator import write_cohort_report
+
+    # Built first so a cut-off it cannot serve fails before extraction
+    if use_lsh and text_method != "combined":
+        raise ValueError("LSH pruning is only bounded for the combined text method")
+    lsh = MinHashLSH.for_min_similarity(min_similarity) if use_lsh else None
+    progress = progress or (lambda stage, done, total: None)
+    started = time.time()
+    submissions = discover_submissions(source)
+    paths = {path: name for name, path in submissions.items()}
+    cache = ExtractionCache(cache_dir) if cache_dir else None
+
+    texts, codes, failed = {}, {}, []
+    progress("extract", 0, len(paths))
+    for done, (path, (text, _, confidence)) in enumerate(
+            extract_batch(list(paths), max_workers=workers, timeout=timeout, cache=cache), 1):
+        name = paths[path]
+        if confidence == 0:
+            failed.append(name)
+        elif os.path.splitext(path)[1].lower() in CODE_EXTENSIONS:
+            codes[name] = text
+        else:
+            texts[name] = text
+        progress("extract", done, len(paths))
+
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {}
+    progress("compare_text", 0, 0)
+    if top_k:
+        records = top_similarities(texts, top_k, min_similarity, lsh=lsh, exclude_citations=exclude_citations,
+                                   method=text_method)
+    else:
+        records = iter_similarities(texts, min_similarity, lsh=lsh, exclude_citations=exclude_citations,
+                                    method=text_method)
+    records = _reporting(records, "compare_text", progress)
+    if cohort:
+        outputs["text"] = write_cohort_report(records, texts, os.path.join(output_dir, "cohort"))
+    else:
+        outputs["text"] = os.path.join(output_dir, "text_pairs.csv")
+        write_similarities(records, outputs["text"])
+
+    progress("compare_code", 0, 1)
+    outputs["code"] = os.path.join(output_dir, "code_pairs.csv")
+    starter_code = None
+    if starter:
+        starter_code = {name: extract_text_from_file(path)[0] for name, path in discover_submissions(starter).items()}
+    write_similarities(compare_code_submissions(codes, min_similarity, method=code_method, starter_code=starter_code,
+                                                max_doc_share=max_doc_share, min_cohort=min_cohort),
+                       outputs["code"])
+    progress("compare_code", 1, 1)
+
+    summary = {
+        "submissions": len(submissions),
+        "text_documents": len(texts),
+        "code_documents": len(codes),
+        "failed_extractions": failed,
+        "outputs": outputs,
+        "seconds": round(time.time() - started, 3),
+    }
+    if instrumentation.enabled():
+        summary["instrumentation"] = instrumentation.snapshot()
+    with open(os.path.join(output_dir, "summary.json"), 'w') as f:
+        json.dump(summary, f, indent=4)
+    return summary
+
+def _reporting(records, stage, progress, every=1000):
+    # Pair counts are not known up front, so total stays 0; the calls also
+    # give a cancelled job a chance to stop mid-comparison.
+    count = 0
+    for count, record in enumerate(records, 1):
+        if count % every == 0:
+            progress(stage, count, 0)
+        yield record
+    progress(stage, count, 0)
+
+class JobCancelled(Exception):
+    """Raised inside a job's progress callback once it has been cancelled."""
+
+class Job:
+    """A queued unit of work and its status, progress and result."""
+
+    def __init__(self, job_id, name, params):
+        self.id = job_id
+        self.name = name
+        self.params = params
+        self.status = "queued"
+        self.stage = None
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        self.finished = threading.Event()
+
+    def progress(self, stage, done, total):
+        if self.cancel_requested:
+            raise JobCancelled(self.id)
+        self.stage, self.done, self.total = stage, done, total
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "params": self.params,
+            "status": self.status,
+            "progress": {"stage": self.stage, "done": self.done, "total": self.total},
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class JobQueue:
+    """Run jobs in the background, at most ``max_workers`` at a time.
+
+    A job function receives a ``progress(stage, done, total)`` callback as
+    its ``progress`` keyword argument. Cancelling a running job takes effect
+    at its next progress call. Only the latest ``history`` finished jobs are
+    kept.
+    """
+
+    def __init__(self, max_workers=2, history=1000):
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def _next_id(self):
+        with self._lock:
+            return f"{int(time.time())}-{next(self._ids)}"
+
+    def submit(self, func, name=None, **params):
+        return self._submit(self._next_id(), func, name, params)
+
+    def _submit(self, job_id, func, name, params):
+        job = Job(job_id, name or func.__name__, params)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func)
+        instrumentation.count("jobs_submitted")
+        return job
+
+    def submit_check(self, source, output_dir=None, **options):
+        """Queue a ``run_check`` over ``source``.
+
+        Each job writes to its own ``<output_dir>/<job id>`` directory
+        (``output_dir`` defaulting to ``reports/batch``), so concurrent
+        checks never overwrite each other's results.
+        """
+        job_id = self._next_id()
+        output_dir = os.path.join(output_dir or BATCH_OUTPUT_DIR, job_id)
+        return self._submit(job_id, run_check, "check", dict(source=source, output_dir=output_dir, **options))
+
+    def _run(self, job, func):
+        if job.cancel_requested:
+            self._finish(job, "cancelled")
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = func(progress=job.progress, **job.params)
+        except JobCancelled:
+            self._finish(job, "cancelled")
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            self._finish(job, "failed")
+        else:
+            self._finish(job, "done")
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+        job.finished.set()
+        instrumentation.count(f"jobs_{status}")
+        with self._lock:
+            finished = [job_id for job_id, queued in self._jobs.items() if queued.finished.is_set()]
+            for job_id in finished[:max(0, len(finished) - self.history)]:
+                del self._jobs[job_id]
+
+    def get(self, job_id):
+        """The job with ``job_id``; raises KeyError if unknown or forgotten."""
+        with self._lock:
+            return self._jobs[job_id]
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Ask a job to stop; returns False if it has already finished."""
+        job = self.get(job_id)
+        if job.finished.is_set():
+            return False
+        job.cancel_requested = True
+        return True
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job finishes (or ``timeout``) and return it."""
+        job = self.get(job_id)
+        job.finished.wait(timeout)
+        return job
+
+    def shutdown(self, wait=True):
+        for job in self.jobs():
+            if not job.finished.is_set():
+                job.cancel_requested = True
+        self._executor.shutdown(wait=wait)
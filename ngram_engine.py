@@ -0,0 +1,115 @@
+# Hashed n-gram sets with vectorized containment / Jaccard similarity
+import re
+import numpy as np
+from scipy.sparse import csr_matrix
+from text_analysis import analyze
+from winnowing import HASH_BASE, token_hash
+
+_WORD = re.compile(r'\S+')
+_STRIP = ".,()[]{}<>\"':;!?\n"
+
+def token_hash_array(tokens):
+    """``winnowing.token_hash`` of every token as a uint64 array."""
+    vocabulary = {token: token_hash(token) for token in set(tokens)}
+    return np.fromiter((vocabulary[token] for token in tokens), dtype=np.uint64, count=len(tokens))
+
+def ngram_hash_array(token_hashes, n=3):
+    """Polynomial hash of every run of ``n`` tokens, as a uint64 array.
+
+    Values equal ``winnowing.kgram_hashes(tokens, n)``; uint64 arithmetic
+    wraps modulo 2**64 just like the pure-Python version.
+    """
+    count = len(token_hashes) - n + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.uint64)
+    hashes = np.zeros(count, dtype=np.uint64)
+    base = np.uint64(HASH_BASE)
+    for j in range(n):
+        hashes = hashes * base + token_hashes[j:j + count]
+    return hashes
+
+def token_spans(text):
+    """Character ``(start, end)`` of each ``text_analysis.tokenize`` token."""
+    spans = []
+    for m in _WORD.finditer(text):
+        word = m.group()
+        start = m.start() + len(word) - len(word.lstrip(_STRIP))
+        spans.append((start, max(start, m.start() + len(word.rstrip(_STRIP)))))
+    return np.array(spans, dtype=np.int64).reshape(-1, 2)
+
+def _similarity(a, b, metric):
+    shared = np.intersect1d(a, b, assume_unique=True).size
+    if metric == "containment":
+        return shared / a.size if a.size else 0.0
+    union = a.size + b.size - shared
+    return shared / union if union else 0.0
+
+def ngram_similarity(text1, text2, n=3, metric="jaccard"):
+    """Jaccard (default) or containment of ``text1`` in ``text2``, from 0 to 1,
+    over the sets of ``get_ngrams`` n-grams."""
+    a = np.unique(analyze(text1).ngram_hashes(n))
+    b = np.unique(analyze(text2).ngram_hashes(n))
+    return _similarity(a, b, metric)
+
+class NgramIndex:
+    """Corpus of documents stored as sorted arrays of unique n-gram hashes.
+
+    ``similarity_matrix`` scores every pair at once with one sparse product;
+    ``matching_spans`` maps shared hashes back to character offsets.
+    """
+
+    def __init__(self, n=3):
+        self.n = n
+        self.keys = []
+        self._docs = []
+        self._sets = []
+
+    def add(self, key, text):
+        doc = analyze(text)
+        self.keys.append(key)
+        self._docs.append(doc)
+        self._sets.append(np.unique(doc.ngram_hashes(self.n)))
+
+    def _index(self, key):
+        return self.keys.index(key)
+
+    def similarity(self, key_a, key_b, metric="jaccard"):
+        return _similarity(self._sets[self._index(key_a)], self._sets[self._index(key_b)], metric)
+
+    def similarity_matrix(self, metric="jaccard"):
+        """Dense ``len(keys)`` square matrix of pairwise scores from 0 to 1.
+
+        For ``"containment"``, entry ``[i, j]`` is the share of document
+        ``i``'s n-grams that also occur in document ``j``.
+        """
+        sizes = np.array([s.size for s in self._sets], dtype=np.float64)
+        if not sizes.sum():
+            return np.zeros((len(self.keys), len(self.keys)))
+        columns, inverse = np.unique(np.concatenate(self._sets), return_inverse=True)
+        rows = np.repeat(np.arange(len(self._sets)), sizes.astype(np.int64))
+        member = csr_matrix((np.ones(rows.size), (rows, inverse)), shape=(len(self._sets), columns.size))
+        shared = (member @ member.T).toarray()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if metric == "containment":
+                scores = shared / sizes[:, None]
+            else:
+                scores = shared / (sizes[:, None] + sizes[None, :] - shared)
+        return np.nan_to_num(scores)
+
+    def matching_spans(self, key_a, key_b):
+        """Character spans in ``key_a``'s text covered by n-grams it shares
+        with ``key_b``, merged where they overlap."""
+        doc = self._docs[self._index(key_a)]
+        hashes = doc.ngram_hashes(self.n)
+        starts = np.flatnonzero(np.isin(hashes, self._sets[self._index(key_b)]))
+        if not starts.size:
+            return []
+        spans = token_spans(doc.text)
+        merged = []
+        for start in starts.tolist():
+            end = start + self.n
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        return [(int(spans[start][0]), int(spans[end - 1][1])) for start, end in merged]
@@ -2,6 +2,9 @@ import pandas as pd
 from datetime import datetime
 import json
 import os
+import itertools
+from html import escape
+import instrumentation
 
 def generate_comparison_report(file1_name, file2_name, similarity_score, text_stats1, text_stats2, 
                              citations1, citations2, ngram_sim=None, paraphrase_score=None):
@@ -27,24 +30,34 @@ def generate_comparison_report(file1_name, file2_name, similarity_score, text_st
     }
     return report
 
+def _unique_report_path(output_dir, extension):
+    # Microsecond timestamp plus an exclusive create, so reports saved in the
+    # same second (or by parallel workers) never overwrite each other.
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    for attempt in itertools.count():
+        suffix = f"_{attempt}" if attempt else ""
+        filepath = os.path.join(output_dir, f"plagiarism_report_{timestamp}{suffix}.{extension}")
+        try:
+            with open(filepath, 'x'):
+                return filepath
+        except FileExistsError:
+            continue
+
+@instrumentation.timed("report_json")
 def save_report_json(report, output_dir="reports"):
     """Save the report in JSON format."""
-    os.makedirs(output_dir, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"plagiarism_report_{timestamp}.json"
-    filepath = os.path.join(output_dir, filename)
+    filepath = _unique_report_path(output_dir, "json")
     
     with open(filepath, 'w') as f:
         json.dump(report, f, indent=4)
     
     return filepath
 
+@instrumentation.timed("report_excel")
 def save_report_excel(report, output_dir="reports"):
     """Save the report in Excel format with multiple sheets."""
-    os.makedirs(output_dir, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"plagiarism_report_{timestamp}.xlsx"
-    filepath = os.path.join(output_dir, filename)
+    filepath = _unique_report_path(output_dir, "xlsx")
     
     # Create Excel writer
     with pd.ExcelWriter(filepath, engine='xlsxwriter') as writer:
@@ -59,14 +72,17 @@ def save_report_excel(report, output_dir="reports"):
         stats_df.to_excel(writer, sheet_name='Document Statistics')
         
         # Citations sheet
-        citations_df = pd.DataFrame(report["citations_found"])
+        # Files usually have different numbers of citations
+        citations_df = pd.DataFrame({name: pd.Series(found, dtype=object)
+                                     for name, found in report["citations_found"].items()})
         citations_df.to_excel(writer, sheet_name='Citations Found')
     
     return filepath
 
-def generate_html_report(report):
-    """Generate an HTML version of the report."""
-    html = f"""
+# Report HTML as format templates, one per repeated fragment; every value is
+# escaped before it is substituted. The templates are tiny next to the
+# citation lists, whose cost is the escaping, done a chunk at a time below.
+_HTML_HEAD = """
     <html>
     <head>
         <title>Plagiarism Check Report</title>
@@ -84,17 +100,17 @@ def generate_html_report(report):
         
         <div class="section">
             <h2>Report Metadata</h2>
-            <p><strong>Generated at:</strong> {report["report_metadata"]["generated_at"]}</p>
-            <p><strong>Files Compared:</strong> {', '.join(report["report_metadata"]["files_compared"])}</p>
+            <p><strong>Generated at:</strong> {generated_at}</p>
+            <p><strong>Files Compared:</strong> {files_compared}</p>
         </div>
         
         <div class="section">
             <h2>Similarity Analysis</h2>
             <table>
                 <tr><th>Metric</th><th>Score</th></tr>
-                <tr><td>Overall Similarity</td><td>{report["similarity_analysis"]["overall_similarity"]}</td></tr>
-                <tr><td>N-gram Similarity</td><td>{report["similarity_analysis"]["ngram_similarity"]}</td></tr>
-                <tr><td>Paraphrase Detection</td><td>{report["similarity_analysis"]["paraphrase_detection_score"]}</td></tr>
+                <tr><td>Overall Similarity</td><td>{overall_similarity}</td></tr>
+                <tr><td>N-gram Similarity</td><td>{ngram_similarity}</td></tr>
+                <tr><td>Paraphrase Detection</td><td>{paraphrase_detection_score}</td></tr>
             </table>
         </div>
         
@@ -102,54 +118,177 @@ def generate_html_report(report):
             <h2>Document Statistics</h2>
             <table>
                 <tr><th>Metric</th>
-                    <th>{report["report_metadata"]["files_compared"][0]}</th>
-                    <th>{report["report_metadata"]["files_compared"][1]}</th></tr>
-    """
-    
-    # Add document statistics
-    for metric in report["document_statistics"][report["report_metadata"]["files_compared"][0]].keys():
-        html += f"""
+                    <th>{file1}</th>
+                    <th>{file2}</th></tr>
+    """.format
+
+_HTML_STAT_ROW = """
                 <tr>
-                    <td>{metric}</td>
-                    <td>{report["document_statistics"][report["report_metadata"]["files_compared"][0]][metric]}</td>
-                    <td>{report["document_statistics"][report["report_metadata"]["files_compared"][1]][metric]}</td>
+                    <td>{}</td>
+                    <td>{}</td>
+                    <td>{}</td>
                 </tr>
-        """
-    
-    html += """
+        """.format
+
+_HTML_CITATIONS_START = """
             </table>
         </div>
         
         <div class="section">
             <h2>Citations Found</h2>
     """
-    
-    for file_name in report["citations_found"]:
-        html += f"""
-            <h3>{file_name}</h3>
+
+_HTML_CITATION_FILE = """
+            <h3>{}</h3>
             <ul>
-        """
-        for citation in report["citations_found"][file_name]:
-            html += f"<li>{citation}</li>"
-        html += "</ul>"
-    
-    html += """
+        """.format
+
+_HTML_END = """
         </div>
     </body>
     </html>
     """
-    
-    return html
 
+def _esc(value):
+    return escape(str(value))
+
+def stream_html_report(report, citations_per_chunk=1000):
+    """Render the HTML report as a sequence of string chunks.
+
+    Citations are emitted ``citations_per_chunk`` at a time, so a writer
+    never holds more than one chunk of a large report in memory.
+    """
+    files = report["report_metadata"]["files_compared"]
+    stats1 = report["document_statistics"][files[0]]
+    stats2 = report["document_statistics"][files[1]]
+    yield _HTML_HEAD(
+        generated_at=_esc(report["report_metadata"]["generated_at"]),
+        files_compared=_esc(', '.join(files)),
+        file1=_esc(files[0]),
+        file2=_esc(files[1]),
+        **{key: _esc(value) for key, value in report["similarity_analysis"].items()},
+    )
+    yield "".join([_HTML_STAT_ROW(_esc(metric), _esc(stats1[metric]), _esc(stats2[metric])) for metric in stats1])
+    yield _HTML_CITATIONS_START
+    for file_name, citations in report["citations_found"].items():
+        yield _HTML_CITATION_FILE(_esc(file_name))
+        for start in range(0, len(citations), citations_per_chunk):
+            # Escape a whole chunk in one pass; NUL marks the item boundaries
+            chunk = citations[start:start + citations_per_chunk]
+            try:
+                joined = "\x00".join(chunk)
+            except TypeError:  # not all strings
+                joined = "\x00".join(map(str, chunk))
+            yield "<li>" + escape(joined).replace("\x00", "</li><li>") + "</li>"
+        yield "</ul>"
+    yield _HTML_END
+
+def generate_html_report(report):
+    """Generate an HTML version of the report."""
+    return "".join(stream_html_report(report))
+
+@instrumentation.timed("report_html")
 def save_report_html(report, output_dir="reports"):
     """Save the report in HTML format."""
-    os.makedirs(output_dir, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"plagiarism_report_{timestamp}.html"
-    filepath = os.path.join(output_dir, filename)
+    filepath = _unique_report_path(output_dir, "html")
     
-    html_content = generate_html_report(report)
     with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+        for chunk in stream_html_report(report):
+            f.write(chunk)
     
-    return filepath 
\ No newline at end of file
+    return filepath 
+
+COHORT_PAIR_COLUMNS = ["file1", "file2", "similarity", "ngram_similarity", "paraphrase_score"]
+
+def _cohort_rows(pair_results):
+    for record in pair_results:
+        row = {"file1": record["file1"], "file2": record["file2"]}
+        for column in COHORT_PAIR_COLUMNS[2:]:
+            value = record.get(column)
+            row[column] = float(value) if value is not None else None
+        yield row
+
+@instrumentation.timed("report_cohort")
+def write_cohort_report(pair_results, documents, output_dir="reports/cohort", batch_size=65536):
+    """Write a whole cohort's results to a columnar (Parquet) store in one pass.
+
+    ``pair_results`` is an iterable of pair records (``file1``, ``file2``,
+    ``similarity`` and optionally ``ngram_similarity`` / ``paraphrase_score``)
+    such as ``compare_text.iter_similarities`` yields; it is consumed in
+    batches. ``documents`` maps file names to text (or ``DocumentAnalysis``)
+    for the statistics and citation tables. Scores are stored as numbers.
+    Returns the store directory; render single pairs with ``load_pair_report``.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from text_analysis import analyze, find_citations, generate_text_statistics
+
+    os.makedirs(output_dir, exist_ok=True)
+    schema = pa.schema([
+        ("file1", pa.string()), ("file2", pa.string()), ("similarity", pa.float64()),
+        ("ngram_similarity", pa.float64()), ("paraphrase_score", pa.float64()),
+    ])
+    with pq.ParquetWriter(os.path.join(output_dir, "pairs.parquet"), schema) as writer:
+        batch = []
+        for row in _cohort_rows(pair_results):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                batch = []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+
+    statistics = []
+    citations = []
+    for name, text in documents.items():
+        doc = analyze(text)
+        stats, _ = generate_text_statistics(doc)
+        statistics.append({"file": name, **stats})
+        citations.extend(
+            {"file": name, "position": position, "citation": citation}
+            for position, citation in enumerate(find_citations(doc))
+        )
+    pd.DataFrame(statistics).to_parquet(os.path.join(output_dir, "statistics.parquet"), index=False)
+    pd.DataFrame(citations, columns=["file", "position", "citation"]).to_parquet(
+        os.path.join(output_dir, "citations.parquet"), index=False
+    )
+    with open(os.path.join(output_dir, "metadata.json"), 'w') as f:
+        json.dump({"generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                   "documents": len(documents)}, f, indent=4)
+    return output_dir
+
+def load_cohort_pairs(store_dir, min_similarity=None):
+    """Pair table of a cohort store as a DataFrame, optionally filtered."""
+    filters = [("similarity", ">=", min_similarity)] if min_similarity is not None else None
+    return pd.read_parquet(os.path.join(store_dir, "pairs.parquet"), filters=filters)
+
+def load_pair_report(store_dir, file1_name, file2_name):
+    """Build a ``generate_comparison_report`` dict for one pair of a cohort store."""
+    pairs = pd.read_parquet(os.path.join(store_dir, "pairs.parquet"), filters=[
+        [("file1", "==", file1_name), ("file2", "==", file2_name)],
+        [("file1", "==", file2_name), ("file2", "==", file1_name)],
+    ])
+    if pairs.empty:
+        raise KeyError(f"No pair {file1_name!r} / {file2_name!r} in {store_dir}")
+    row = pairs.iloc[0]
+    names = [file1_name, file2_name]
+    stats = pd.read_parquet(os.path.join(store_dir, "statistics.parquet"),
+                            filters=[("file", "in", names)]).set_index("file").to_dict("index")
+    cites = pd.read_parquet(os.path.join(store_dir, "citations.parquet"),
+                            filters=[("file", "in", names)]).sort_values("position")
+    optional = lambda value: None if pd.isna(value) else float(value)
+    return generate_comparison_report(
+        file1_name, file2_name, float(row["similarity"]),
+        stats[file1_name],
+        stats[file2_name],
+        cites.loc[cites["file"] == file1_name, "citation"].tolist(),
+        cites.loc[cites["file"] == file2_name, "citation"].tolist(),
+        ngram_sim=optional(row["ngram_similarity"]),
+        paraphrase_score=optional(row["paraphrase_score"]),
+    )
+
+def save_pair_report(store_dir, file1_name, file2_name, fmt="html", output_dir="reports"):
+    """Render one pair of a cohort store on demand as ``html``, ``excel`` or ``json``."""
+    report = load_pair_report(store_dir, file1_name, file2_name)
+    savers = {"html": save_report_html, "excel": save_report_excel, "json": save_report_json}
+    return savers[fmt](report, output_dir)
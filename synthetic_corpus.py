@@ -0,0 +1,169 @@
+# Deterministic synthetic corpora of clean, plagiarized and paraphrased submissions
+import os
+import random
+
+_SYLLABLES = ['ka', 'lo', 'mi', 'ren', 'to', 'sa', 'vel', 'dor', 'ni', 'ques', 'ar', 'pe', 'lum', 'is', 'tra']
+_FUNCTION_WORDS = ['the', 'of', 'and', 'to', 'in', 'is', 'that', 'for', 'with', 'as', 'on', 'by']
+
+def _vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+def _sentence(rng, vocabulary):
+    words = [rng.choice(vocabulary) if rng.random() > 0.3 else rng.choice(_FUNCTION_WORDS)
+             for _ in range(rng.randint(6, 24))]
+    words[0] = words[0].capitalize()
+    if rng.random() < 0.15:
+        words.insert(rng.randrange(1, len(words)), f"({rng.choice(vocabulary).capitalize()}, {rng.randint(1950, 2024)})")
+    if len(words) > 8 and rng.random() < 0.4:
+        words[rng.randrange(2, len(words) - 1)] += ","
+    return " ".join(words) + rng.choice(['.', '.', '.', '?', '!'])
+
+def _text(rng, vocabulary, words):
+    sentences = []
+    count = 0
+    while count < words:
+        sentence = _sentence(rng, vocabulary)
+        sentences.append(sentence)
+        count += len(sentence.split())
+    return " ".join(sentences)
+
+def _paraphrase(rng, text, synonyms):
+    # Swap words for fixed synonyms and drop some function words
+    out = []
+    for word in text.split():
+        if word.lower() in _FUNCTION_WORDS and rng.random() < 0.3:
+            continue
+        out.append(synonyms.get(word, word) if rng.random() < 0.5 else word)
+    return " ".join(out)
+
+def generate_text_corpus(n_docs, words_per_doc=500, plagiarized_share=0.2, paraphrased_share=0.2,
+                         passage_share=0.5, seed=0):
+    """Build ``n_docs`` prose submissions with known overlaps.
+
+    A ``plagiarized_share`` of the documents copy ``passage_share`` of an
+    earlier document verbatim, a ``paraphrased_share`` copy it through
+    synonym swaps and dropped function words; the rest are independent.
+    Returns ``(texts, truth)`` where ``truth`` lists
+    ``{"file", "source", "kind"}`` for every derived document. The same
+    arguments always give the same corpus.
+    """
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, 3000)
+    synonyms = {word: rng.choice(vocabulary) for word in vocabulary}
+    texts = {}
+    truth = []
+    for index in range(n_docs):
+        name = f"doc_{index:05d}.txt"
+        text = _text(rng, vocabulary, words_per_doc)
+        roll = rng.random()
+        if texts and roll < plagiarized_share + paraphrased_share:
+            source = rng.choice(list(texts))
+            words = texts[source].split()
+            length = int(len(words) * passage_share)
+            start = rng.randrange(len(words) - length + 1)
+            passage = " ".join(words[start:start + length])
+            kind = "plagiarized" if roll < plagiarized_share else "paraphrased"
+            if kind == "paraphrased":
+                passage = _paraphrase(rng, passage, synonyms)
+            own = text.split()
+            text = " ".join(own[:len(own) - length] + passage.split())
+            truth.append({"file": name, "source": source, "kind": kind})
+        texts[name] = text
+    return texts, truth
+
+_OPERATORS = ['+', '-', '*', '%']
+_COMPARISONS = ['<', '>', '==', '!=']
+
+def _statements(rng, names, depth, python):
+    # Random statement mix so unrelated submissions differ in structure too
+    lines = []
+    for _ in range(rng.randint(2, 6)):
+        a, b, c = rng.sample(names, 3)
+        n = rng.randint(2, 99)
+        kind = rng.choice(['assign', 'assign', 'call', 'print', 'if', 'loop'] if depth < 2 else ['assign', 'call'])
+        if kind == 'assign':
+            lines.append(f"{a} = {b} {rng.choice(_OPERATORS)} {n}" + ("" if python else ";"))
+        elif kind == 'call':
+            lines.append(f"{a} = {c}({b}, {n})" + ("" if python else ";"))
+        elif kind == 'print':
+            lines.append(f'print("{c}", {a})' if python else f'printf("{c} %d\\n", {a});')
+        else:
+            if kind == 'if':
+                header = f"if {a} {rng.choice(_COMPARISONS)} {n}" if python else f"if ({a} {rng.choice(_COMPARISONS)} {n})"
+            else:
+                header = f"for {a} in range({n})" if python else f"for (int {a} = 0; {a} < {n}; {a}++)"
+            body = ["    " + line for line in _statements(rng, names, depth + 1, python)]
+            lines.extend([header + (":" if python else " {")] + body + ([] if python else ["}"]))
+    return lines
+
+def _function(rng, vocabulary, python):
+    names = rng.sample(vocabulary, 8)
+    body = ["    " + line for line in _statements(rng, names[1:], 0, python)]
+    if python:
+        return "\n".join([f"def {names[0]}({names[1]}, {names[2]}):"] + body + [f"    return {names[3]}"]) + "\n"
+    declarations = f"    int {', '.join(names[3:])};"
+    return "\n".join([f"int {names[0]}(int {names[1]}, int {names[2]}) {{", declarations] + body
+                     + [f"    return {names[3]};", "}"]) + "\n"
+
+def _code(rng, vocabulary, lines, python):
+    blocks = []
+    count = 0
+    while count < lines:
+        block = _function(rng, vocabulary, python)
+        blocks.append(block)
+        count += block.count("\n") + 1
+    return "\n".join(blocks)
+
+def _rename(code, vocabulary, rng):
+    renames = {word: f"{word}_{rng.randint(0, 9)}" for word in vocabulary}
+    return "".join(renames.get(token, token) for token in _split_identifiers(code))
+
+def _split_identifiers(code):
+    token = []
+    for char in code:
+        if char.isalnum() or char == "_":
+            token.append(char)
+        else:
+            if token:
+                yield "".join(token)
+                token = []
+            yield char
+    if token:
+        yield "".join(token)
+
+def generate_code_corpus(n_docs, lines_per_doc=200, language="python", copied_share=0.2, seed=0):
+    """Build ``n_docs`` code submissions; a ``copied_share`` of them are an
+    earlier submission with every identifier renamed and half of its
+    functions kept. Returns ``(code_texts, truth)`` like
+    ``generate_text_corpus``."""
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, 400)
+    python = language == "python"
+    extension = ".py" if language == "python" else ".c"
+    codes = {}
+    truth = []
+    for index in range(n_docs):
+        name = f"sub_{index:05d}{extension}"
+        code = _code(rng, vocabulary, lines_per_doc, python)
+        if codes and rng.random() < copied_share:
+            source = rng.choice(list(codes))
+            blocks = codes[source].split("\n\n")
+            copied = _rename("\n\n".join(blocks[:len(blocks) // 2 + 1]), vocabulary, rng)
+            code = copied + "\n\n" + "\n\n".join(code.split("\n\n")[len(blocks) // 2 + 1:])
+            truth.append({"file": name, "source": source, "kind": "renamed_copy"})
+        codes[name] = code
+    return codes, truth
+
+def write_corpus(texts, directory):
+    """Write ``{name: text}`` to ``directory`` and return the file paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, text in texts.items():
+        path = os.path.join(directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
@@ -0,0 +1,11 @@
+from alignment import alignment_similarity, prepare
+
+def test_documents_shorter_than_k_are_compared_whole():
+    assert alignment_similarity(['a', 'b'], ['a', 'b']) == 100.0
+    assert alignment_similarity(prepare(['a', 'b']), prepare(['q', 'a', 'b', 'z'] * 3)) == 100.0
+    assert alignment_similarity(['a', 'c'], ['a', 'b', 'c']) == 0.0
+
+def test_repetitive_copies_still_align():
+    assert alignment_similarity(['x'] * 500, ['x'] * 500) == 100.0
+    assert alignment_similarity(['a', 'b'] * 300, ['q'] + ['a', 'b'] * 300) == 100.0
+    assert alignment_similarity(['a', 'b', 'c'] * 200, ['z', 'y'] + ['a', 'b', 'c'] * 200 + ['w'] * 9) == 100.0
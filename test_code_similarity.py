@@ -0,0 +1,64 @@
+import pytest
+from code_similarity import compare_code_fingerprints
+from compare_text import compare_code_submissions
+from lsh import MinHashLSH
+
+SOLUTION = """
+def mean(values):
+    total = 0
+    for value in values:
+        total += value
+    return total / len(values)
+
+def variance(values):
+    centre = mean(values)
+    return sum((value - centre) ** 2 for value in values) / len(values)
+"""
+
+UNRELATED = """
+class Stack:
+    def __init__(self):
+        self.items = []
+
+    def push(self, item):
+        self.items.append(item)
+
+    def pop(self):
+        if not self.items:
+            raise IndexError("empty stack")
+        return self.items.pop()
+"""
+
+def scores(results):
+    return {(r["file1"], r["file2"]): r["similarity"] for r in results}
+
+def test_three_identical_copies_score_100():
+    results = scores(compare_code_fingerprints({"a.py": SOLUTION, "b.py": SOLUTION, "c.py": SOLUTION}))
+    assert results == {("a.py", "b.py"): 100.0, ("a.py", "c.py"): 100.0, ("b.py", "c.py"): 100.0}
+
+def test_copy_ring_next_to_unrelated_submission():
+    results = scores(compare_code_fingerprints(
+        {"a.py": SOLUTION, "b.py": SOLUTION, "c.py": SOLUTION, "d.py": UNRELATED}
+    ))
+    assert results[("a.py", "b.py")] == results[("b.py", "c.py")] == 100.0
+    assert results[("a.py", "d.py")] < 20
+
+def test_starter_code_is_ignored():
+    starter = {"starter.py": SOLUTION}
+    results = scores(compare_code_fingerprints(
+        {"a.py": SOLUTION + UNRELATED, "b.py": SOLUTION}, starter_code=starter
+    ))
+    assert results[("a.py", "b.py")] == 0.0
+
+def test_winnow_rejects_lsh():
+    with pytest.raises(ValueError):
+        compare_code_submissions({"a.py": SOLUTION, "b.py": SOLUTION}, lsh=MinHashLSH(), method="winnow")
+
+def test_boilerplate_filter_through_compare_code_submissions():
+    codes = {f"s{i}.py": SOLUTION + f"\ndef extra_{i}(x):\n    return x * {i} + {i * 7}\n" for i in range(4)}
+    unfiltered = scores(compare_code_submissions(codes, method="winnow"))
+    filtered = scores(compare_code_submissions(codes, method="winnow", max_doc_share=0.5, min_cohort=4))
+    assert unfiltered[("s0.py", "s1.py")] > 50
+    assert filtered[("s0.py", "s1.py")] == 0.0
+    with pytest.raises(ValueError):
+        compare_code_submissions(codes, method="combined", max_doc_share=0.5)
@@ -0,0 +1,32 @@
+import pytest
+from compare_text import (combined_similarity, compare_all_submissions, iter_similarities, preprocess,
+                          top_similarities)
+from synthetic_corpus import generate_text_corpus
+
+@pytest.fixture(scope="module")
+def cohort():
+    texts, _ = generate_text_corpus(25, 150, seed=11)
+    names = list(texts)
+    reference = {
+        (a, b): combined_similarity(preprocess(texts[a]), preprocess(texts[b]))
+        for index, a in enumerate(names) for b in names[index + 1:]
+    }
+    return texts, reference
+
+def pairs(records):
+    return {(r["file1"], r["file2"]): r["similarity"] for r in records}
+
+@pytest.mark.parametrize("min_similarity", [0, 20, 45])
+def test_compare_all_matches_pairwise_scores(cohort, min_similarity):
+    texts, reference = cohort
+    expected = {pair: score for pair, score in reference.items() if score >= min_similarity}
+    assert expected
+    assert pairs(compare_all_submissions(texts, min_similarity)) == expected
+    assert pairs(iter_similarities(texts, min_similarity)) == expected
+
+@pytest.mark.parametrize("k", [1, 10, 50])
+def test_top_similarities_matches_pairwise_scores(cohort, k):
+    texts, reference = cohort
+    top = top_similarities(texts, k)
+    assert [r["similarity"] for r in top] == sorted(reference.values(), reverse=True)[:k]
+    assert all(reference[pair] == score for pair, score in pairs(top).items())
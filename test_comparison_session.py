@@ -0,0 +1,26 @@
+import pytest
+from compare_text import compare_all_submissions
+from comparison_session import ComparisonSession
+from synthetic_corpus import generate_text_corpus
+
+@pytest.fixture(scope="module")
+def corpus():
+    texts, _ = generate_text_corpus(24, 150, seed=12)
+    return texts
+
+@pytest.mark.parametrize("min_similarity", [0, 20])
+def test_session_matches_compare_all_after_changes(corpus, min_similarity):
+    names = list(corpus)
+    session = ComparisonSession({name: corpus[name] for name in names[:20]}, min_similarity=min_similarity)
+    for name in names[20:]:
+        session.add(name, corpus[name])
+    session.add(names[3], corpus[names[7]])
+    session.remove(names[5])
+
+    current = {name: corpus[name] for name in names if name != names[5]}
+    current[names[3]] = corpus[names[7]]
+    expected = compare_all_submissions(current, min_similarity)
+    assert session.results() == expected
+    assert session.similarity(names[4], names[3]) == session.similarity(names[3], names[4])
+    assert [r["similarity"] for r in session.top_k(5)] == sorted(
+        (r["similarity"] for r in expected), reverse=True)[:5]
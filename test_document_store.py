@@ -0,0 +1,28 @@
+import pytest
+from compare_text import compare_all_submissions
+from document_store import DocumentStore
+from lsh import MinHashLSH
+from synthetic_corpus import generate_text_corpus
+
+@pytest.fixture(scope="module")
+def corpus():
+    texts, _ = generate_text_corpus(30, 150, plagiarized_share=0.3, passage_share=0.9, seed=13)
+    return texts
+
+@pytest.mark.parametrize("min_similarity", [0, 20, 60])
+def test_store_matches_compare_all(corpus, min_similarity):
+    expected = compare_all_submissions(corpus, min_similarity)
+    assert expected
+    assert DocumentStore.from_texts(corpus).compare_all(min_similarity) == expected
+
+def test_store_matches_compare_all_with_lsh(corpus):
+    store = DocumentStore.from_texts(corpus)
+    expected = compare_all_submissions(corpus, 60, MinHashLSH.for_min_similarity(60))
+    assert expected
+    assert store.compare_all(60, MinHashLSH.for_min_similarity(60)) == expected
+
+def test_saved_store_scores_the_same(corpus, tmp_path):
+    store = DocumentStore.from_texts(corpus)
+    loaded = DocumentStore.load(store.save(str(tmp_path / "store")))
+    assert loaded.compare_all(20) == store.compare_all(20)
+    assert loaded.words(3) == store.words(3)
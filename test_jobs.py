@@ -0,0 +1,19 @@
+from jobs import JobQueue
+
+def test_concurrent_checks_write_to_their_own_directories(tmp_path):
+    for cohort in ("a", "b"):
+        (tmp_path / cohort).mkdir()
+        for i in range(3):
+            (tmp_path / cohort / f"{cohort}{i}.txt").write_text(f"essay {cohort} number {i} about plagiarism")
+    queue = JobQueue(max_workers=2)
+    try:
+        jobs = [queue.submit_check(str(tmp_path / cohort), output_dir=str(tmp_path / "out"), workers=1)
+                for cohort in ("a", "b")]
+        results = [queue.wait(job.id, timeout=120) for job in jobs]
+    finally:
+        queue.shutdown()
+    assert [job.status for job in results] == ["done", "done"]
+    texts = [job.result["outputs"]["text"] for job in results]
+    assert texts[0] != texts[1]
+    assert "a0.txt" in open(texts[0]).read()
+    assert "b0.txt" in open(texts[1]).read()
@@ -0,0 +1,34 @@
+from collections import Counter
+import pytest
+from compare_text import lsh_candidates, preprocess, score_pairs
+from lsh import MinHashLSH
+from synthetic_corpus import generate_text_corpus
+
+@pytest.fixture(scope="module")
+def cohort():
+    texts, _ = generate_text_corpus(60, 200, plagiarized_share=0.3, passage_share=0.9, seed=3)
+    docs = [preprocess(text) for text in texts.values()]
+    return docs, {(i, j): score for i, j, score in score_pairs(docs)}
+
+def _weighted_jaccard(a, b):
+    a, b = Counter(a), Counter(b)
+    return sum((a & b).values()) / sum((a | b).values())
+
+@pytest.mark.parametrize("min_similarity", [51, 60, 75, 90])
+def test_pairs_above_cut_off_meet_the_jaccard_bound(cohort, min_similarity):
+    docs, scores = cohort
+    bound = MinHashLSH.jaccard_bound(min_similarity)
+    hits = [pair for pair, score in scores.items() if score >= min_similarity]
+    assert hits
+    assert all(_weighted_jaccard(docs[i], docs[j]) >= bound for i, j in hits)
+
+@pytest.mark.parametrize("min_similarity, max_share", [(60, 0.6), (75, 0.1), (90, 0.05)])
+def test_for_min_similarity_recall_and_pruning(cohort, min_similarity, max_share):
+    docs, scores = cohort
+    candidates = lsh_candidates(docs, MinHashLSH.for_min_similarity(min_similarity))
+    assert {pair for pair, score in scores.items() if score >= min_similarity} <= candidates
+    assert len(candidates) <= max_share * len(scores)
+
+def test_cut_offs_without_a_bound_are_rejected():
+    with pytest.raises(ValueError):
+        MinHashLSH.for_min_similarity(50)
@@ -0,0 +1,32 @@
+from text_analysis import extract_citations, find_citations, mask_citations
+
+ESSAY = """Method
+1. Collect the essays from every student.
+2. Remove the cover pages (Smith, 2019).
+3. Compare each pair [4].
+
+Results follow Jones et al. closely.
+
+References
+1. Smith, J. Detecting plagiarism. Journal of Writing, 2019.
+2. The Open Plagiarism Corpus. Online dataset.
+"""
+
+def test_numbered_list_is_not_a_citation():
+    assert find_citations(ESSAY) == [
+        "(Smith, 2019)",
+        "[4]",
+        "et al.",
+        "1. Smith, J. Detecting plagiarism. Journal of Writing, 2019.",
+        "2. The Open Plagiarism Corpus. Online dataset.",
+    ]
+
+def test_reference_like_entry_outside_a_references_section():
+    text = "Sources I used:\n1. Brown, A. Essays on essays. 2021.\n2. Read them twice."
+    assert [c.kind for c in extract_citations(text)] == ["reference"]
+
+def test_masking_keeps_numbered_list_text():
+    masked = mask_citations(ESSAY)
+    assert "1. Collect the essays from every student." in masked
+    assert "Detecting plagiarism" not in masked
+    assert len(masked) == len(ESSAY)
@@ -1,13 +1,11 @@
-import nltk
-from nltk.util import ngrams
-from nltk.tokenize import sent_tokenize
+import logging
 import re
-from collections import Counter
-import pandas as pd
-import plotly.express as px
+from collections import Counter, namedtuple
+from functools import cached_property
 import time
 import os
-import ssl
+
+logger = logging.getLogger(__name__)
 
 def format_size(size_bytes):
     """Format size in bytes to human readable format."""
@@ -17,66 +15,90 @@ def format_size(size_bytes):
         size_bytes /= 1024
     return f"{size_bytes:.1f} GB"
 
-def ensure_nltk_data():
-    """Ensure all required NLTK data is downloaded."""
-    # First, try to create an unverified SSL context for downloads
+# Extra NLTK data directories searched before downloading anything: an
+# explicit offline path, then an nltk_data folder vendored next to this module.
+NLTK_DATA_DIRS = [
+    path for path in (
+        os.environ.get('PLAGIARISM_NLTK_DATA'),
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data'),
+    ) if path
+]
+# Set PLAGIARISM_NLTK_DOWNLOAD=0 on offline hosts to never touch the network.
+# Downloads verify TLS; behind an intercepting proxy, point SSL_CERT_FILE at
+# its CA bundle.
+ALLOW_NLTK_DOWNLOAD = os.environ.get('PLAGIARISM_NLTK_DOWNLOAD', '1') != '0'
+
+NLTK_PACKAGES = [
+    ('punkt', 'tokenizers/punkt'),
+    ('punkt_tab', 'tokenizers/punkt_tab'),
+    ('averaged_perceptron_tagger', 'taggers/averaged_perceptron_tagger'),
+    ('stopwords', 'corpora/stopwords'),
+    ('wordnet', 'corpora/wordnet'),
+    ('omw-1.4', 'corpora/omw-1.4'),
+]
+
+def _nltk():
+    import nltk
+    for path in NLTK_DATA_DIRS:
+        if path not in nltk.data.path:
+            nltk.data.path.insert(0, path)
+    return nltk
+
+def _has_nltk_resource(nltk, resource):
     try:
-        _create_unverified_https_context = ssl._create_unverified_context
-    except AttributeError:
-        pass
-    else:
-        ssl._create_default_https_context = _create_unverified_https_context
-
-    # Clear any existing corrupted downloads
-    nltk_data_dir = os.path.expanduser('~/nltk_data')
-    if os.path.exists(nltk_data_dir):
-        for subdir in ['tokenizers', 'taggers', 'corpora']:
-            path = os.path.join(nltk_data_dir, subdir)
-            if os.path.exists(path):
-                try:
-                    import shutil
-                    shutil.rmtree(path)
-                    print(f"Cleaned up {path}")
-                except Exception as e:
-                    print(f"Could not clean up {path}: {e}")
-
-    # List of required NLTK packages
-    packages = [
-        ('punkt', 'Punkt Tokenizer'),
-        ('averaged_perceptron_tagger', 'Perceptron Tagger'),
-        ('stopwords', 'Stopwords'),
-        ('wordnet', 'WordNet'),
-        ('omw-1.4', 'Open Multilingual WordNet')
-    ]
-
-    print("\nDownloading NLTK data packages:")
-    for package, description in packages:
-        print(f"\nProcessing {description}...")
+        nltk.data.find(resource)
+        return True
+    except LookupError:
+        return False
+
+def ensure_nltk_data(packages=None):
+    """Download the NLTK packages that are not already installed.
+
+    Existing data is never removed. Returns the names of packages that are
+    still missing afterwards.
+    """
+    nltk = _nltk()
+    wanted = [(name, resource) for name, resource in NLTK_PACKAGES if packages is None or name in packages]
+    missing = [name for name, resource in wanted if not _has_nltk_resource(nltk, resource)]
+    failed = []
+    for name in missing:
         try:
-            nltk.download(package, quiet=True, raise_on_error=True)
-            print(f"✓ Successfully downloaded {description}")
+            nltk.download(name, quiet=True, raise_on_error=True)
         except Exception as e:
-            print(f"× Failed to download {description}: {e}")
-            # Try alternative download method
-            try:
-                import urllib.request
-                url = f"https://raw.githubusercontent.com/nltk/nltk_data/gh-pages/packages/{package}.zip"
-                save_path = os.path.join(nltk_data_dir, f"{package}.zip")
-                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                urllib.request.urlretrieve(url, save_path)
-                print(f"✓ Successfully downloaded {description} using alternative method")
-            except Exception as e2:
-                print(f"× Failed alternative download for {description}: {e2}")
-
-    print("\nNLTK data download process completed.")
-    print(f"Data directory: {nltk_data_dir}")
-
-# Initialize NLTK data when module is imported
-try:
-    ensure_nltk_data()
-except Exception as e:
-    print(f"Warning: Error during NLTK data initialization: {e}")
-    print("The application will continue with limited functionality.")
+            logger.warning("Could not download NLTK package %s: %s", name, e)
+            failed.append(name)
+    return failed
+
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+(?=["\'(\[]?[A-Z0-9])')
+
+def simple_sent_tokenize(text):
+    """Pure-Python sentence splitter used when NLTK's punkt is unavailable."""
+    return [s.strip() for s in _SENTENCE_BOUNDARY.split(text) if s.strip()]
+
+_sentence_tokenizer = None
+
+def _load_sentence_tokenizer():
+    try:
+        nltk = _nltk()
+    except ImportError:
+        return simple_sent_tokenize
+    if ALLOW_NLTK_DOWNLOAD and not (_has_nltk_resource(nltk, 'tokenizers/punkt')
+                                    or _has_nltk_resource(nltk, 'tokenizers/punkt_tab')):
+        ensure_nltk_data(['punkt', 'punkt_tab'])
+    from nltk.tokenize import sent_tokenize as nltk_sent_tokenize
+    try:
+        nltk_sent_tokenize("Check. Done.")
+    except LookupError:
+        logger.warning("NLTK punkt data not found; using simple sentence splitting.")
+        return simple_sent_tokenize
+    return nltk_sent_tokenize
+
+def sent_tokenize(text):
+    """Split text into sentences, resolving the NLTK tokenizer on first use."""
+    global _sentence_tokenizer
+    if _sentence_tokenizer is None:
+        _sentence_tokenizer = _load_sentence_tokenizer()
+    return _sentence_tokenizer(text)
 
 # Common stopwords from main app
 STOPWORDS = {
@@ -94,112 +116,211 @@ def filter_stopwords(tokens):
     """Remove stopwords from token list."""
     return [word.lower() for word in tokens if word.lower() not in STOPWORDS]
 
-def analyze_sentence_structure(text):
-    """Analyze the structure of sentences in the text."""
-    try:
-        sentences = sent_tokenize(text)
-    except Exception as e:
-        print(f"Warning: Error in sentence tokenization: {e}")
-        # Fallback to simple sentence splitting
-        sentences = [s.strip() for s in text.split('.') if s.strip()]
-    
-    patterns = []
-    for sentence in sentences:
+class DocumentAnalysis:
+    """Analysis of one document, computed lazily and cached.
+
+    Tokens, sentences, stopword-filtered tokens, n-grams, word frequencies
+    and statistics are each derived once from the raw text. Every analysis
+    function in this module accepts a ``DocumentAnalysis`` in place of a
+    string, so a pairwise report reads each document's text only once.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self._ngrams = {}
+        self._ngram_hashes = {}
+
+    @cached_property
+    def tokens(self):
         try:
-            length = len(sentence.split())
-            has_comma = ',' in sentence
-            ends_with = sentence[-1] if sentence else ''
-            patterns.append({
-                'length': length,
-                'has_comma': has_comma,
-                'ending': ends_with
-            })
+            return tokenize(self.text)
         except Exception as e:
-            print(f"Warning: Error analyzing sentence: {e}")
-            continue
-    return patterns
+            logger.warning("Error in word tokenization: %s", e)
+            return self.text.split()
+
+    @cached_property
+    def sentences(self):
+        try:
+            return sent_tokenize(self.text)
+        except Exception as e:
+            logger.warning("Error in sentence tokenization: %s", e)
+            # Fallback to simple sentence splitting
+            return [s.strip() for s in self.text.split('.') if s.strip()]
+
+    @cached_property
+    def filtered_tokens(self):
+        return filter_stopwords(self.tokens)
+
+    @cached_property
+    def word_freq(self):
+        return Counter(self.filtered_tokens)
+
+    @cached_property
+    def citations(self):
+        return extract_citations(self)
+
+    @cached_property
+    def sentence_structure(self):
+        patterns = []
+        for sentence in self.sentences:
+            try:
+                length = len(sentence.split())
+                has_comma = ',' in sentence
+                ends_with = sentence[-1] if sentence else ''
+                patterns.append({
+                    'length': length,
+                    'has_comma': has_comma,
+                    'ending': ends_with
+                })
+            except Exception as e:
+                logger.warning("Error analyzing sentence: %s", e)
+                continue
+        return patterns
+
+    def ngrams(self, n=3):
+        if n not in self._ngrams:
+            n_grams = zip(*(self.tokens[i:] for i in range(n)))
+            self._ngrams[n] = [' '.join(gram) for gram in n_grams]
+        return self._ngrams[n]
+
+    @cached_property
+    def token_hashes(self):
+        from ngram_engine import token_hash_array
+        return token_hash_array(self.tokens)
+
+    def ngram_hashes(self, n=3):
+        """64-bit hashes of ``ngrams(n)`` in the same order, as a NumPy array."""
+        if n not in self._ngram_hashes:
+            from ngram_engine import ngram_hash_array
+            self._ngram_hashes[n] = ngram_hash_array(self.token_hashes, n)
+        return self._ngram_hashes[n]
+
+    @cached_property
+    def statistics(self):
+        words = self.tokens
+        try:
+            sentences = self.sentences
+            stats = {
+                'Word Count': len(words),
+                'Sentence Count': len(sentences),
+                'Average Words per Sentence': round(len(words) / len(sentences), 2) if sentences else 0,
+                'Unique Words': len(set(words)),
+                'Character Count': len(self.text),
+            }
+            most_common = dict(self.word_freq.most_common(10))
+        except Exception as e:
+            logger.warning("Error generating statistics: %s", e)
+            stats = {
+                'Word Count': 0,
+                'Sentence Count': 0,
+                'Average Words per Sentence': 0,
+                'Unique Words': 0,
+                'Character Count': 0,
+            }
+            most_common = {}
+        return stats, most_common
+
+def analyze(text):
+    """Return ``text`` as a ``DocumentAnalysis``, reusing one if given."""
+    return text if isinstance(text, DocumentAnalysis) else DocumentAnalysis(text)
+
+def analyze_sentence_structure(text):
+    """Analyze the structure of sentences in the text."""
+    return analyze(text).sentence_structure
 
 def get_ngrams(text, n=3):
     """Generate n-grams from text."""
-    tokens = tokenize(text)
-    n_grams = list(ngrams(tokens, n))
-    return [' '.join(gram) for gram in n_grams]
+    return analyze(text).ngrams(n)
 
 def detect_paraphrasing(text1, text2):
     """Detect potential paraphrasing between two texts."""
-    sent_struct_1 = analyze_sentence_structure(text1)
-    sent_struct_2 = analyze_sentence_structure(text2)
+    doc1, doc2 = analyze(text1), analyze(text2)
+    sent_struct_1 = str(doc1.sentence_structure)
+    sent_struct_2 = str(doc2.sentence_structure)
     
-    struct_similarity = len(set(str(sent_struct_1)) & set(str(sent_struct_2))) / \
-                       max(len(str(sent_struct_1)), len(str(sent_struct_2)))
+    struct_similarity = len(set(sent_struct_1) & set(sent_struct_2)) / \
+                       max(len(sent_struct_1), len(sent_struct_2))
     
-    words1 = set(filter_stopwords(tokenize(text1)))
-    words2 = set(filter_stopwords(tokenize(text2)))
+    words1 = set(doc1.filtered_tokens)
+    words2 = set(doc2.filtered_tokens)
     
     word_overlap = len(words1.intersection(words2)) / max(len(words1), len(words2))
     
     return (struct_similarity + word_overlap) / 2
 
+Citation = namedtuple('Citation', ['kind', 'text', 'start', 'end'])
+
+# All citation forms in one precompiled alternation, so a document is
+# scanned once and matches come back in document order.
+CITATION_PATTERN = re.compile(r"""
+    (?P<author_year>\(\w+,\s*\d{4}\))              # (Author, YYYY)
+  | (?P<numeric>\[\d+\])                          # [1]
+  | (?P<et_al>(?<!\w)et\ al\.)                    # et al.
+  | ^[ \t]*(?P<reference>\d+\.[ \t]+[A-Z][^\r\n]*)  # 1. Reference entry (whole line)
+""", re.VERBOSE | re.MULTILINE)
+
+# A heading that starts the reference list
+REFERENCES_HEADING = re.compile(
+    r'^[ \t]*(?:references|bibliography|works cited|literature cited|sources)[ \t]*:?[ \t]*$',
+    re.IGNORECASE | re.MULTILINE,
+)
+# A numbered entry that looks like a reference on its own: "Surname, I." and a year
+REFERENCE_ENTRY = re.compile(r"\d+\.[ \t]+[A-Z][\w'-]+,[ \t]+[A-Z]\b.*?\b(?:1[5-9]|20)\d{2}\b")
+
+def extract_citations(text):
+    """Find citations as ``Citation(kind, text, start, end)`` in document order.
+
+    A numbered line (``1. Smith, J. ...``) is a reference, reported as the
+    whole line, only after a References/Bibliography heading or when it
+    names an author and a year; ordinary numbered lists are left alone, so
+    they are still compared when citations are excluded.
+    """
+    text = analyze(text).text
+    heading = REFERENCES_HEADING.search(text)
+    section_start = heading.end() if heading else len(text) + 1
+    found = []
+    position = 0
+    while True:
+        m = CITATION_PATTERN.search(text, position)
+        if m is None:
+            return found
+        kind = m.lastgroup
+        start, end = m.span(kind)
+        if kind == 'reference' and start < section_start and not REFERENCE_ENTRY.match(m.group(kind)):
+            # A list item, not a reference: keep scanning inside the line
+            position = start + 1
+            continue
+        found.append(Citation(kind, m.group(kind), start, end))
+        position = m.end()
+
 def find_citations(text):
     """Find citation patterns in text."""
-    patterns = [
-        r'\(\w+,\s*\d{4}\)',  # (Author, YYYY)
-        r'\[\d+\]',           # [1]
-        r'(?<!\w)et al\.',    # et al.
-        r'\d+\.\s*\w+',       # 1. Reference
-    ]
-    
-    citations = []
-    for pattern in patterns:
-        matches = re.finditer(pattern, text)
-        citations.extend([m.group() for m in matches])
-    
-    return citations
+    return [citation.text for citation in analyze(text).citations]
+
+def mask_citations(text):
+    """Blank out cited spans (same length, so offsets stay valid) to keep
+    them out of similarity scoring."""
+    doc = analyze(text)
+    parts = []
+    position = 0
+    for citation in doc.citations:
+        parts.append(doc.text[position:citation.start])
+        parts.append(" " * (citation.end - citation.start))
+        position = citation.end
+    parts.append(doc.text[position:])
+    return "".join(parts)
 
 def generate_text_statistics(text):
     """Generate comprehensive statistics for a text."""
-    try:
-        words = tokenize(text)
-    except Exception as e:
-        print(f"Warning: Error in word tokenization: {e}")
-        words = text.split()
-    
-    try:
-        sentences = sent_tokenize(text)
-    except Exception as e:
-        print(f"Warning: Error in sentence tokenization: {e}")
-        sentences = [s.strip() for s in text.split('.') if s.strip()]
-    
-    try:
-        stats = {
-            'Word Count': len(words),
-            'Sentence Count': len(sentences),
-            'Average Words per Sentence': round(len(words) / len(sentences), 2) if sentences else 0,
-            'Unique Words': len(set(words)),
-            'Character Count': len(text),
-        }
-        
-        word_freq = Counter(filter_stopwords(words))
-        most_common = dict(word_freq.most_common(10))
-        
-    except Exception as e:
-        print(f"Warning: Error generating statistics: {e}")
-        stats = {
-            'Word Count': 0,
-            'Sentence Count': 0,
-            'Average Words per Sentence': 0,
-            'Unique Words': 0,
-            'Character Count': 0,
-        }
-        most_common = {}
-    
-    return stats, most_common
+    return analyze(text).statistics
 
 def visualize_comparison(text1, text2, filename1, filename2):
     """Generate visualization comparing two texts."""
+    import pandas as pd
+    import plotly.express as px
     try:
-        stats1, freq1 = generate_text_statistics(text1)
-        stats2, freq2 = generate_text_statistics(text2)
+        stats1, freq1 = generate_text_statistics(analyze(text1))
+        stats2, freq2 = generate_text_statistics(analyze(text2))
         
         # Statistics comparisonx
         stats_df = pd.DataFrame({
@@ -226,7 +347,7 @@ def visualize_comparison(text1, text2, filename1, filename2):
         
         return fig_stats, fig_freq
     except Exception as e:
-        print(f"Warning: Error in visualization: {e}")
+        logger.warning("Error in visualization: %s", e)
         # Return empty figures as fallback
         empty_fig = px.bar(pd.DataFrame({'x': [0], 'y': [0]}))
         return empty_fig, empty_fig 
\ No newline at end of file
@@ -0,0 +1,113 @@
+# k-gram hashing and winnowing (Schleimer, Wilkerson & Aiken) for document fingerprints
+from collections import deque
+from hashlib import blake2b
+
+_MASK = (1 << 64) - 1
+HASH_BASE = 1000003
+
+def token_hash(token):
+    """Stable 64-bit hash of a token (independent of PYTHONHASHSEED)."""
+    return int.from_bytes(blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def kgram_hashes(tokens, k=5):
+    """Rolling 64-bit hashes of every run of ``k`` consecutive tokens.
+
+    The hash of ``tokens[i:i + k]`` is the polynomial
+    ``sum(token_hash(t) * BASE ** (k - 1 - j))`` modulo 2**64, updated in
+    constant time per position.
+    """
+    if len(tokens) < k:
+        return []
+    vocabulary = {token: token_hash(token) for token in set(tokens)}
+    values = [vocabulary[token] for token in tokens]
+    top = pow(HASH_BASE, k - 1, 1 << 64)
+    h = 0
+    for value in values[:k]:
+        h = (h * HASH_BASE + value) & _MASK
+    hashes = [h]
+    for i in range(k, len(values)):
+        h = ((h - values[i - k] * top) * HASH_BASE + values[i]) & _MASK
+        hashes.append(h)
+    return hashes
+
+def winnow(hashes, window=4):
+    """Select ``(hash, position)`` fingerprints from a list of k-gram hashes.
+
+    Every run of ``window`` consecutive hashes contributes its minimum
+    (rightmost on ties), so any match of at least ``window + k - 1`` tokens
+    is guaranteed to share a fingerprint.
+    """
+    if not hashes:
+        return []
+    if len(hashes) <= window:
+        position = min(range(len(hashes)), key=lambda i: (hashes[i], -i))
+        return [(hashes[position], position)]
+    fingerprints = []
+    chosen = -1
+    for start in range(len(hashes) - window + 1):
+        if chosen < start:
+            chosen = min(range(start, start + window), key=lambda i: (hashes[i], -i))
+            fingerprints.append((hashes[chosen], chosen))
+        elif hashes[start + window - 1] < hashes[chosen]:
+            chosen = start + window - 1
+            fingerprints.append((hashes[chosen], chosen))
+    return fingerprints
+
+def fingerprint(tokens, k=5, window=4):
+    """Winnowed fingerprints of a token list."""
+    return winnow(kgram_hashes(tokens, k), window)
+
+class Fingerprinter:
+    """Incremental ``fingerprint``: feed token chunks, get fingerprints as
+    soon as they are fixed.
+
+    Memory is bounded by ``k + window`` hashes, and the concatenated output
+    of ``feed`` calls plus ``finish`` equals ``fingerprint`` over all tokens.
+    """
+
+    def __init__(self, k=5, window=4):
+        self.k = k
+        self.window = window
+        self._top = pow(HASH_BASE, k - 1, 1 << 64)
+        self._values = deque(maxlen=k)
+        self._hash = 0
+        self._recent = deque(maxlen=window)
+        self._count = 0
+        self._chosen = None
+
+    def _push(self, h):
+        # Same selection rule as winnow(), over a sliding window of (hash, position)
+        self._recent.append((h, self._count))
+        self._count += 1
+        if self._count < self.window:
+            return None
+        start = self._count - self.window
+        if self._chosen is None or self._chosen[1] < start:
+            self._chosen = min(self._recent, key=lambda entry: (entry[0], -entry[1]))
+            return self._chosen
+        if h < self._chosen[0]:
+            self._chosen = (h, self._count - 1)
+            return self._chosen
+        return None
+
+    def feed(self, tokens):
+        """Consume more tokens and return the fingerprints they complete."""
+        fingerprints = []
+        for token in tokens:
+            value = token_hash(token)
+            if len(self._values) == self.k:
+                self._hash = ((self._hash - self._values[0] * self._top) * HASH_BASE + value) & _MASK
+            else:
+                self._hash = (self._hash * HASH_BASE + value) & _MASK
+            self._values.append(value)
+            if len(self._values) == self.k:
+                selected = self._push(self._hash)
+                if selected is not None:
+                    fingerprints.append(selected)
+        return fingerprints
+
+    def finish(self):
+        """Return the fingerprint of a document shorter than one window."""
+        if 0 < self._count < self.window:
+            return [min(self._recent, key=lambda entry: (entry[0], -entry[1]))]
+        return []